@@ -5,10 +5,40 @@ from datetime import datetime
 class DataUploadResponse(BaseModel):
     message: str
     filename: str
+    dataset_id: Optional[str] = None
     rows: int
     columns: int
     column_names: List[str]
     preview: List[Dict[str, Any]]
+    cleaning_report: Optional[Dict[str, Any]] = None
+    
+class DataAppendResponse(BaseModel):
+    message: str
+    dataset_id: str
+    rows_received: int
+    rows_appended: int
+    rows_dropped_missing: int
+    rows_dropped_outliers: int
+    total_rows: int
+    rules_refitted: bool
+    
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    status_url: str
+    
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    phase: str
+    progress: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
     
 class DataStats(BaseModel):
     total_rows: int
@@ -16,10 +46,26 @@ class DataStats(BaseModel):
     missing_values: Dict[str, int]
     numeric_columns: List[str]
     categorical_columns: List[str]
+    dtypes: Optional[Dict[str, str]] = None
+    memory_usage: Optional[Dict[str, Dict[str, int]]] = None
+    
+class CleanDataRequest(BaseModel):
+    strategy: str = Field("iqr", description="Outlier strategy: iqr, zscore, or mad")
+    threshold: Optional[float] = Field(None, gt=0, description="Strategy threshold (defaults: iqr 1.5, zscore 3.0, mad 3.5)")
+    dataset_id: Optional[str] = Field(None, description="Dataset to clean (defaults to the active dataset)")
     
 class ModelTrainRequest(BaseModel):
     algorithm: str = Field(..., description="Algorithm to use: linear, random_forest, or xgboost")
     test_size: float = Field(0.2, ge=0.1, le=0.5, description="Test set size (0.1 to 0.5)")
+    dataset_id: Optional[str] = Field(None, description="Dataset to train on (defaults to the active dataset)")
+    out_of_core: bool = Field(False, description="Stream the dataset from disk in record batches instead of loading it")
+    
+class ModelTuneRequest(BaseModel):
+    algorithm: str = Field(..., description="Algorithm to tune: random_forest or xgboost")
+    test_size: float = Field(0.2, ge=0.1, le=0.5, description="Test set size (0.1 to 0.5)")
+    budget_seconds: float = Field(60.0, gt=0, le=3600, description="Wall-clock budget for the search")
+    n_candidates: int = Field(27, ge=2, le=243, description="Configurations sampled for the first rung")
+    dataset_id: Optional[str] = Field(None, description="Dataset to tune on (defaults to the active dataset)")
     
 class ModelMetrics(BaseModel):
     r2_score: float
@@ -33,9 +79,46 @@ class ModelTrainResponse(BaseModel):
     metrics: ModelMetrics
     training_time: float
     feature_importance: Optional[Dict[str, float]] = None
+    version: Optional[int] = None
+    
+class ModelCompareRequest(BaseModel):
+    algorithms: Optional[List[str]] = Field(None, description="Algorithms to compare (defaults to all available)")
+    test_size: float = Field(0.2, ge=0.1, le=0.5, description="Test set size (0.1 to 0.5)")
+    auto_promote: bool = Field(False, description="Serve the best model when the comparison finishes")
+    dataset_id: Optional[str] = Field(None, description="Dataset to train on (defaults to the active dataset)")
+    
+class CrossValidationRequest(BaseModel):
+    algorithm: str = Field(..., description="Algorithm to use: linear, random_forest, or xgboost")
+    n_splits: int = Field(5, ge=2, le=20, description="Number of folds")
+    n_repeats: int = Field(1, ge=1, le=10, description="Repeats of k-fold, each with a different shuffle")
+    dataset_id: Optional[str] = Field(None, description="Dataset to evaluate on (defaults to the active dataset)")
+    
+class MetricSummary(BaseModel):
+    mean: float
+    std: float
+    min: float
+    max: float
+    
+class CrossValidationResponse(BaseModel):
+    algorithm: str
+    n_splits: int
+    n_repeats: int
+    metrics: Dict[str, MetricSummary]
+    folds: List[Dict[str, Any]]
+    training_time: float
+    total_fit_time: float
+    
+class ModelRetrainRequest(BaseModel):
+    test_size: float = Field(0.2, ge=0.1, le=0.5, description="Share of the new rows held out for evaluation")
+    
+class ModelRetrainResponse(ModelTrainResponse):
+    rows_added: int
+    evaluated_rows: int
+    total_rows: int
     
 class PredictionRequest(BaseModel):
     experience: float = Field(..., ge=0, description="Years of experience")
+    features: Optional[Dict[str, float]] = Field(None, description="Values of the model's other features by name")
     
 class BatchPredictionRequest(BaseModel):
     predictions: List[PredictionRequest]
@@ -47,6 +130,28 @@ class PredictionResponse(BaseModel):
 class BatchPredictionResponse(BaseModel):
     predictions: List[PredictionResponse]
     
+class FeaturePredictionRequest(BaseModel):
+    features: Dict[str, float] = Field(..., description="Feature values keyed by the model's feature names")
+    
+class FeaturePredictionResponse(BaseModel):
+    features: Dict[str, float]
+    predicted_salary: float
+    
+class ColumnarPredictionRequest(BaseModel):
+    columns: Optional[Dict[str, List[float]]] = Field(None, description="One array of values per feature")
+    rows: Optional[List[List[float]]] = Field(None, description="Row-major matrix of feature values")
+    feature_names: Optional[List[str]] = Field(None, description="Column names of rows; defaults to the model's feature order")
+    
+class ColumnarPredictionResponse(BaseModel):
+    predictions: List[float]
+    count: int
+    version: Optional[int] = None
+    
+class BenchmarkBatchRequest(BaseModel):
+    experiences: List[float] = Field(..., min_length=1, max_length=100000, description="Experience levels to benchmark")
+    window: float = Field(1.0, ge=0, description="Years of experience either side of each level")
+    dataset_id: Optional[str] = Field(None, description="Dataset to benchmark against (defaults to the active dataset)")
+    
 class InsightsResponse(BaseModel):
     average_salary: float
     median_salary: float
@@ -1,118 +1,169 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from app.models.schemas import InsightsResponse
+from app.models.schemas import InsightsResponse, BenchmarkBatchRequest
 from app.services.data_service import DataService
+from app.services.salary_index import SalaryIndex
+from app.utils.serialization import negotiate, table_response
 import pandas as pd
 import numpy as np
 from io import BytesIO, StringIO
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 router = APIRouter()
 data_service = DataService()
 
+def _dataset_id(dataset_id: Optional[str]) -> str:
+    """Pin a request to one dataset, so a concurrent upload cannot switch it halfway through"""
+    dataset_id = dataset_id or data_service.get_dataset_id()
+    if dataset_id is None:
+        raise ValueError("No data loaded")
+    return dataset_id
+
+def _summarize(data: pd.DataFrame, dataset_id: str) -> Dict[str, Any]:
+    """Compute the insights summary for a snapshot of a dataset"""
+    # Detect salary column (usually named 'Salary' or last numeric column)
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+    salary_col = 'Salary' if 'Salary' in numeric_cols else numeric_cols[-1]
+    experience_col = 'Experience' if 'Experience' in data.columns else numeric_cols[0]
+    
+    # Calculate statistics (the mean comes from the running aggregates)
+    salary_agg = data_service.get_aggregates(dataset_id)["numeric"][salary_col]
+    average_salary = salary_agg["sum"] / salary_agg["count"] if salary_agg["count"] else float("nan")
+    quantiles = data[salary_col].quantile([0.25, 0.50, 0.75, 0.90])
+    
+    # Salary by experience brackets
+    if experience_col in data.columns:
+        # Create experience brackets
+        data['exp_bracket'] = pd.cut(
+            data[experience_col],
+            bins=[0, 2, 5, 10, 20, 100],
+            labels=['0-2 years', '2-5 years', '5-10 years', '10-20 years', '20+ years']
+        )
+        salary_by_exp = data.groupby('exp_bracket', observed=True)[salary_col].mean().to_dict()
+        salary_by_exp = {str(k): float(v) for k, v in salary_by_exp.items()}
+    else:
+        salary_by_exp = {}
+    
+    # Percentiles
+    percentiles = {
+        "25th": float(quantiles[0.25]),
+        "50th": float(quantiles[0.50]),
+        "75th": float(quantiles[0.75]),
+        "90th": float(quantiles[0.90])
+    }
+    
+    return {
+        "average_salary": average_salary,
+        "median_salary": float(quantiles[0.50]),
+        "salary_by_experience": salary_by_exp,
+        "percentiles": percentiles,
+        "total_employees": len(data)
+    }
+
 @router.get("/summary", response_model=InsightsResponse)
-async def get_insights_summary():
+async def get_insights_summary(dataset_id: Optional[str] = None):
     """Get HR insights summary"""
     try:
-        data = data_service.get_data()
-        
-        # Detect salary column (usually named 'Salary' or last numeric column)
-        numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-        salary_col = 'Salary' if 'Salary' in numeric_cols else numeric_cols[-1]
-        experience_col = 'Experience' if 'Experience' in data.columns else numeric_cols[0]
-        
-        # Calculate statistics
-        average_salary = float(data[salary_col].mean())
-        median_salary = float(data[salary_col].median())
-        
-        # Salary by experience brackets
-        if experience_col in data.columns:
-            # Create experience brackets
-            data['exp_bracket'] = pd.cut(
-                data[experience_col], 
-                bins=[0, 2, 5, 10, 20, 100],
-                labels=['0-2 years', '2-5 years', '5-10 years', '10-20 years', '20+ years']
-            )
-            salary_by_exp = data.groupby('exp_bracket', observed=True)[salary_col].mean().to_dict()
-            salary_by_exp = {str(k): float(v) for k, v in salary_by_exp.items()}
-        else:
-            salary_by_exp = {}
-        
-        # Percentiles
-        percentiles = {
-            "25th": float(data[salary_col].quantile(0.25)),
-            "50th": float(data[salary_col].quantile(0.50)),
-            "75th": float(data[salary_col].quantile(0.75)),
-            "90th": float(data[salary_col].quantile(0.90))
-        }
-        
-        return InsightsResponse(
-            average_salary=average_salary,
-            median_salary=median_salary,
-            salary_by_experience=salary_by_exp,
-            percentiles=percentiles,
-            total_employees=len(data)
+        dataset_id = _dataset_id(dataset_id)
+        # Computed once per dataset version
+        summary = data_service.memoize(
+            "insights_summary",
+            lambda data: _summarize(data, dataset_id),
+            dataset_id
         )
+        return InsightsResponse(**summary)
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating insights: {str(e)}")
 
+def _salary_index(dataset_id: str) -> SalaryIndex:
+    """Get the experience-sorted salary index for the current dataset version"""
+    # Detect columns
+    numeric_cols = data_service.get_numeric_columns(dataset_id)
+    columns = data_service.get_column_names(dataset_id)
+    salary_col = 'Salary' if 'Salary' in numeric_cols else numeric_cols[-1]
+    experience_col = 'Experience' if 'Experience' in columns else numeric_cols[0]
+    
+    index = data_service.memoize(
+        ("salary_index", experience_col, salary_col),
+        lambda data: SalaryIndex(data[experience_col], data[salary_col]),
+        dataset_id
+    )
+    if len(index) == 0:
+        raise ValueError("No salary data available for benchmarking")
+    return index
+
 @router.get("/benchmark")
-async def get_salary_benchmark(experience: float):
+async def get_salary_benchmark(experience: float, dataset_id: Optional[str] = None):
     """Get salary benchmark for a given experience level"""
     try:
-        data = data_service.get_data()
-        
-        # Detect columns
-        numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-        salary_col = 'Salary' if 'Salary' in numeric_cols else numeric_cols[-1]
-        experience_col = 'Experience' if 'Experience' in data.columns else numeric_cols[0]
-        
-        # Filter data for similar experience (±1 year)
-        similar_exp_data = data[
-            (data[experience_col] >= experience - 1) & 
-            (data[experience_col] <= experience + 1)
-        ]
-        
-        if len(similar_exp_data) == 0:
-            # Fall back to all data
-            similar_exp_data = data
-        
-        benchmark = {
-            "experience": experience,
-            "average_salary": float(similar_exp_data[salary_col].mean()),
-            "median_salary": float(similar_exp_data[salary_col].median()),
-            "min_salary": float(similar_exp_data[salary_col].min()),
-            "max_salary": float(similar_exp_data[salary_col].max()),
-            "sample_size": len(similar_exp_data)
-        }
-        
-        return benchmark
+        # Similar experience (±1 year), falling back to all data; the index is built off the event loop
+        index = await run_in_threadpool(_salary_index, _dataset_id(dataset_id))
+        return index.query(experience, window=1.0)
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting benchmark: {str(e)}")
 
+@router.post("/benchmark/batch")
+async def get_salary_benchmarks(request: BenchmarkBatchRequest, accept: Optional[str] = Header(None)):
+    """Get salary benchmarks for many experience levels in one call"""
+    response_format = negotiate(accept)
+    try:
+        index = await run_in_threadpool(_salary_index, _dataset_id(request.dataset_id))
+        result = await run_in_threadpool(index.query_batch, request.experiences, window=request.window)
+        if response_format != "json":
+            return table_response(response_format, {
+                "experience": np.asarray(request.experiences, dtype=np.float64),
+                **{key: result[key] for key in ("average_salary", "median_salary", "min_salary", "max_salary", "sample_size")}
+            })
+        benchmarks = [
+            {
+                "experience": experience,
+                "average_salary": average,
+                "median_salary": median,
+                "min_salary": minimum,
+                "max_salary": maximum,
+                "sample_size": size
+            }
+            for experience, average, median, minimum, maximum, size in zip(
+                request.experiences,
+                result["average_salary"].tolist(),
+                result["median_salary"].tolist(),
+                result["min_salary"].tolist(),
+                result["max_salary"].tolist(),
+                result["sample_size"].tolist()
+            )
+        ]
+        return {"benchmarks": benchmarks, "count": len(benchmarks)}
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting benchmarks: {str(e)}")
+
+def _describe(data: pd.DataFrame) -> pd.DataFrame:
+    """Summary statistics of the numeric columns"""
+    return data.select_dtypes(include=[np.number]).describe()
+
+def _describe_csv(data: pd.DataFrame) -> str:
+    """Summary statistics rendered as CSV"""
+    output = StringIO()
+    _describe(data).to_csv(output)
+    return output.getvalue()
+
 @router.get("/export/csv")
-async def export_report_csv():
+async def export_report_csv(dataset_id: Optional[str] = None):
     """Export insights report as CSV"""
     try:
-        data = data_service.get_data()
-        
-        # Create summary statistics
-        numeric_data = data.select_dtypes(include=[np.number])
-        summary = numeric_data.describe()
-        
-        # Convert to CSV
-        output = StringIO()
-        summary.to_csv(output)
-        output.seek(0)
+        report = data_service.memoize("describe_csv", _describe_csv, _dataset_id(dataset_id))
         
         return StreamingResponse(
-            iter([output.getvalue()]),
+            iter([report]),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=salary_insights.csv"}
         )
@@ -121,14 +172,12 @@ async def export_report_csv():
         raise HTTPException(status_code=500, detail=f"Error exporting report: {str(e)}")
 
 @router.get("/export/excel")
-async def export_report_excel():
+async def export_report_excel(dataset_id: Optional[str] = None):
     """Export insights report as Excel"""
     try:
-        data = data_service.get_data()
-        
-        # Create summary statistics
-        numeric_data = data.select_dtypes(include=[np.number])
-        summary = numeric_data.describe()
+        dataset_id = _dataset_id(dataset_id)
+        data = data_service.get_data(dataset_id)
+        summary = data_service.memoize("describe", _describe, dataset_id)
         
         # Convert to Excel
         output = BytesIO()
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import JobStatus
+from app.services.job_service import JobService, JobNotCancellable
+from typing import Optional
+
+router = APIRouter()
+job_service = JobService()
+
+@router.get("")
+async def list_jobs(kind: Optional[str] = None):
+    """List background jobs, newest first"""
+    jobs = job_service.list_jobs(kind)
+    return {"jobs": jobs, "count": len(jobs)}
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get the status, progress and result of a background job"""
+    try:
+        return JobStatus(**job_service.get(job_id).to_dict())
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the result of a completed background job"""
+    try:
+        job = job_service.get(job_id).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if job["status"] == "failed":
+        raise HTTPException(status_code=400, detail=f"Job failed: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@router.post("/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    try:
+        return JobStatus(**job_service.cancel(job_id).to_dict())
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobNotCancellable as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,30 +1,98 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
-from app.models.schemas import ModelTrainRequest, ModelTrainResponse, ModelMetrics
+from app.models.schemas import (
+    ModelTrainRequest,
+    ModelTrainResponse,
+    ModelMetrics,
+    ModelTuneRequest,
+    ModelCompareRequest,
+    CrossValidationRequest,
+    CrossValidationResponse,
+    ModelRetrainRequest,
+    ModelRetrainResponse,
+    JobSubmitResponse
+)
 from app.services.data_service import DataService
-from app.services.model_service import ModelService
-import os
+from app.services.model_service import (
+    ModelService, train_worker, compare_worker, cross_validate, fold_assignments, MODEL_ALGORITHMS
+)
+from app.services.job_service import JobService, Job
+from app.services.tuning_service import tune_worker, SEARCH_SPACES
+from app.services.out_of_core import fit_out_of_core, out_of_core_worker
+from functools import partial
+from typing import Dict, Any, Optional
 
 router = APIRouter()
 data_service = DataService()
 model_service = ModelService()
+job_service = JobService()
+
+def _train_and_publish(X, y, algorithm: str, test_size: float, lineage: Dict[str, Any]) -> Dict[str, Any]:
+    """Train a model and publish it as a new version (runs in a worker thread)"""
+    return model_service.train_model(X, y, algorithm=algorithm, test_size=test_size, lineage=lineage)
+
+def _train_out_of_core_and_publish(stream: Dict[str, Any], algorithm: str, test_size: float) -> Dict[str, Any]:
+    """Train from the on-disk dataset and publish the model as a new version (runs in a worker thread)"""
+    trained, result = fit_out_of_core(
+        stream["cache_dir"], stream["dataset_id"], stream["features"], stream["target"], algorithm, test_size
+    )
+    trained.lineage = stream["lineage"]
+    version = model_service.publish(trained, training_time=result["training_time"], source="train")
+    return {**result, "version": version}
+
+def _install_trained(job: Job, outcome, lineage: Dict[str, Any]) -> Dict[str, Any]:
+    """Swap a model fitted in a worker process in as the live model"""
+    trained, result = outcome
+    trained.lineage = lineage
+    job.update("publishing")
+    version = model_service.publish(trained, training_time=result["training_time"], source=job.kind)
+    return {**result, "version": version}
+
+def _register_compared(job: Job, outcome, lineage: Dict[str, Any], auto_promote: bool) -> Dict[str, Any]:
+    """Register every compared model as a version, serving the best one when asked"""
+    trained_models, result = outcome
+    job.update("registering")
+    for entry in result["leaderboard"]:
+        trained = trained_models[entry["algorithm"]]
+        trained.lineage = lineage
+        entry["version"] = model_service.register(trained, training_time=entry["training_time"], source=job.kind)
+    
+    best_version = result["leaderboard"][0]["version"]
+    if auto_promote:
+        job.update("promoting")
+        model_service.load_model(best_version)
+    return {**result, "best_version": best_version, "promoted": auto_promote}
+
+def _cross_validate(algorithm: str, n_splits: int, n_repeats: int, dataset_id: Optional[str]) -> Dict[str, Any]:
+    """Evaluate an algorithm with (repeated) k-fold on the current data (runs in a worker thread)"""
+    # Fold indices are computed once per dataset version and shared by every algorithm
+    folds = data_service.memoize(
+        ("cv_folds", n_splits, n_repeats),
+        lambda data: fold_assignments(len(data), n_splits, n_repeats),
+        dataset_id
+    )
+    X, y, _ = data_service.prepare_training_data(dataset_id=dataset_id)
+    return cross_validate(X, y, algorithm, folds)
+
+def _update_and_publish(test_size: float) -> Dict[str, Any]:
+    """Extend the live model with newly appended rows as a new version (runs in a worker thread)"""
+    return model_service.update_model(data_service.prepare_increment, test_size)
 
 @router.post("/train", response_model=ModelTrainResponse)
 async def train_model(request: ModelTrainRequest):
     """Train a machine learning model"""
     try:
-        # Get prepared data
-        X, y = data_service.prepare_features()
+        if request.out_of_core:
+            stream = await run_in_threadpool(data_service.prepare_stream, dataset_id=request.dataset_id)
+            result = await run_in_threadpool(_train_out_of_core_and_publish, stream, request.algorithm, request.test_size)
+            return ModelTrainResponse(**result)
         
-        # Train model
-        result = model_service.train_model(
-            X, y, 
-            algorithm=request.algorithm,
-            test_size=request.test_size
-        )
+        # Get prepared data off the event loop
+        X, y, lineage = await run_in_threadpool(data_service.prepare_training_data, dataset_id=request.dataset_id)
         
-        # Save model
-        model_service.save_model()
+        # Train and save off the event loop
+        result = await run_in_threadpool(_train_and_publish, X, y, request.algorithm, request.test_size, lineage)
         
         return ModelTrainResponse(**result)
     
@@ -33,6 +101,111 @@ async def train_model(request: ModelTrainRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error training model: {str(e)}")
 
+@router.post("/train/async", response_model=JobSubmitResponse, status_code=202)
+async def train_model_async(request: ModelTrainRequest):
+    """Train a model in a worker process; the live model is replaced only when training succeeds"""
+    try:
+        if request.out_of_core:
+            # The worker streams the dataset's Arrow file; only its location crosses the process boundary
+            stream = await run_in_threadpool(data_service.prepare_stream, dataset_id=request.dataset_id)
+            job = job_service.submit_process(
+                "training", out_of_core_worker, stream["cache_dir"], stream["dataset_id"],
+                stream["features"], stream["target"], request.algorithm, request.test_size,
+                on_result=partial(_install_trained, lineage=stream["lineage"])
+            )
+        else:
+            X, y, lineage = await run_in_threadpool(data_service.prepare_training_data, dataset_id=request.dataset_id)
+            job = job_service.submit_process(
+                "training", train_worker, X, y, request.algorithm, request.test_size,
+                on_result=partial(_install_trained, lineage=lineage)
+            )
+        return JobSubmitResponse(
+            job_id=job.job_id,
+            kind=job.kind,
+            status=job.status,
+            status_url=f"/api/jobs/{job.job_id}"
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting training: {str(e)}")
+
+@router.post("/tune", response_model=JobSubmitResponse, status_code=202)
+async def tune_model(request: ModelTuneRequest):
+    """Search hyperparameters with successive halving in a worker process and install the winner"""
+    try:
+        if request.algorithm not in SEARCH_SPACES:
+            raise ValueError(f"Algorithm cannot be tuned: {request.algorithm}")
+        X, y, lineage = await run_in_threadpool(data_service.prepare_training_data, dataset_id=request.dataset_id)
+        job = job_service.submit_process(
+            "tuning", tune_worker, X, y, request.algorithm,
+            request.budget_seconds, request.n_candidates, request.test_size,
+            on_result=partial(_install_trained, lineage=lineage)
+        )
+        return JobSubmitResponse(
+            job_id=job.job_id,
+            kind=job.kind,
+            status=job.status,
+            status_url=f"/api/jobs/{job.job_id}"
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting tuning: {str(e)}")
+
+@router.post("/compare", response_model=JobSubmitResponse, status_code=202)
+async def compare_models(request: ModelCompareRequest):
+    """Train several algorithms side by side on one split in a worker process and rank them"""
+    try:
+        algorithms = request.algorithms or list(MODEL_ALGORITHMS)
+        unknown = [algorithm for algorithm in algorithms if algorithm not in MODEL_ALGORITHMS]
+        if unknown:
+            raise ValueError(f"Unknown algorithm: {', '.join(unknown)}")
+        X, y, lineage = await run_in_threadpool(data_service.prepare_training_data, dataset_id=request.dataset_id)
+        job = job_service.submit_process(
+            "comparison", compare_worker, X, y, algorithms, request.test_size,
+            on_result=partial(_register_compared, lineage=lineage, auto_promote=request.auto_promote)
+        )
+        return JobSubmitResponse(
+            job_id=job.job_id,
+            kind=job.kind,
+            status=job.status,
+            status_url=f"/api/jobs/{job.job_id}"
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting comparison: {str(e)}")
+
+@router.post("/cross-validate", response_model=CrossValidationResponse)
+async def cross_validate_model(request: CrossValidationRequest):
+    """Report the mean and spread of each metric over (repeated) k-fold, fitting folds in parallel"""
+    try:
+        result = await run_in_threadpool(
+            _cross_validate, request.algorithm, request.n_splits, request.n_repeats, request.dataset_id
+        )
+        return CrossValidationResponse(**result)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cross-validating model: {str(e)}")
+
+@router.post("/retrain", response_model=ModelRetrainResponse)
+async def retrain_model(request: ModelRetrainRequest):
+    """Update the live model with rows appended since it was trained, without refitting from scratch"""
+    try:
+        result = await run_in_threadpool(_update_and_publish, request.test_size)
+        return ModelRetrainResponse(**result)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retraining model: {str(e)}")
+
 @router.get("/info")
 async def get_model_info():
     """Get information about the current model"""
@@ -54,23 +227,42 @@ async def get_model_metrics():
         raise HTTPException(status_code=500, detail=f"Error getting metrics: {str(e)}")
 
 @router.get("/download")
-async def download_model():
-    """Download the trained model"""
+async def download_model(version: Optional[int] = None):
+    """Download the trained model (the live version by default)"""
     try:
-        model_path = "models/salary_model.pkl"
-        if not os.path.exists(model_path):
-            raise HTTPException(status_code=404, detail="No trained model found")
+        model_path = model_service.get_artifact_path(version)
+        filename = "salary_model.pkl" if version is None else f"salary_model_v{version}.pkl"
         
         return FileResponse(
             model_path,
             media_type="application/octet-stream",
-            filename="salary_model.pkl"
+            filename=filename
         )
-    except HTTPException:
-        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error downloading model: {str(e)}")
 
+@router.get("/versions")
+async def list_model_versions():
+    """List registered model versions, newest first"""
+    try:
+        versions = model_service.list_versions()
+        return {"versions": versions, "count": len(versions)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing model versions: {str(e)}")
+
+@router.post("/versions/{version}/activate")
+async def activate_model_version(version: int):
+    """Serve a registered model version, e.g. to roll back"""
+    try:
+        await run_in_threadpool(model_service.load_model, version)
+        return model_service.get_model_info()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error activating model version: {str(e)}")
+
 @router.get("/algorithms")
 async def get_available_algorithms():
     """Get list of available algorithms"""
@@ -1,24 +1,56 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.models.schemas import (
-    PredictionRequest, 
+    PredictionRequest,
     PredictionResponse,
     BatchPredictionRequest,
-    BatchPredictionResponse
+    BatchPredictionResponse,
+    FeaturePredictionRequest,
+    FeaturePredictionResponse,
+    ColumnarPredictionRequest,
+    ColumnarPredictionResponse
 )
 from app.services.model_service import ModelService
+from app.services.batching_service import PredictionBatcher
+from app.utils.serialization import negotiate, table_response
+from typing import Dict, Optional, Iterator
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
 
 router = APIRouter()
 model_service = ModelService()
+batcher = PredictionBatcher()
+
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "50000"))  # Rows scored per chunk of a bulk file
+BULK_COPY_SIZE = 1024 * 1024  # 1MB
+BULK_ERROR_MARKER = "#error: "  # Starts the last line of a CSV stream that failed part way
+BULK_FORMATS = {
+    ".csv": "text/csv",
+    ".ndjson": "application/x-ndjson",
+    ".jsonl": "application/x-ndjson"
+}
+
+def _request_features(request: PredictionRequest) -> Dict[str, float]:
+    """Experience plus any other features the model was trained on"""
+    extra = request.features or {}
+    if "Experience" in extra:
+        raise ValueError("Experience must be given as 'experience', not in 'features'")
+    return {"Experience": request.experience, **extra}
 
 @router.post("/single", response_model=PredictionResponse)
-async def predict_single(request: PredictionRequest):
+async def predict_single(request: PredictionRequest, version: Optional[int] = None):
     """Make a single salary prediction"""
     try:
-        # Create feature dict - assuming Experience is the main feature
-        features = {"Experience": request.experience}
+        features = _request_features(request)
         
-        # Make prediction
-        predicted_salary = model_service.predict(features)
+        # Make prediction, batched with concurrent requests
+        predicted_salary = await batcher.predict(features, version)
         
         return PredictionResponse(
             experience=request.experience,
@@ -31,14 +63,22 @@ async def predict_single(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=f"Error making prediction: {str(e)}")
 
 @router.post("/batch", response_model=BatchPredictionResponse)
-async def predict_batch(request: BatchPredictionRequest):
+async def predict_batch(request: BatchPredictionRequest, version: Optional[int] = None,
+                        accept: Optional[str] = Header(None)):
     """Make batch salary predictions"""
+    response_format = negotiate(accept)
     try:
         # Prepare features
-        features_list = [{"Experience": pred.experience} for pred in request.predictions]
+        features_list = [_request_features(pred) for pred in request.predictions]
         
         # Make predictions
-        predicted_salaries = model_service.predict_batch(features_list)
+        predicted_salaries = model_service.predict_batch(features_list, version)
+        
+        if response_format != "json":
+            return table_response(response_format, {
+                "experience": np.fromiter((pred.experience for pred in request.predictions), dtype=np.float64),
+                "predicted_salary": np.asarray(predicted_salaries, dtype=np.float64)
+            })
         
         # Prepare response
         predictions = [
@@ -55,3 +95,109 @@ async def predict_batch(request: BatchPredictionRequest):
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error making batch predictions: {str(e)}")
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get prediction cache hit/miss counters"""
+    return model_service.get_cache_stats()
+
+@router.post("/features", response_model=FeaturePredictionResponse)
+async def predict_features(request: FeaturePredictionRequest, version: Optional[int] = None):
+    """Make a single prediction from values keyed by the model's feature names"""
+    try:
+        predicted_salary = await batcher.predict(request.features, version)
+        return FeaturePredictionResponse(features=request.features, predicted_salary=predicted_salary)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error making prediction: {str(e)}")
+
+@router.post("/columnar", response_model=ColumnarPredictionResponse)
+async def predict_columnar(request: ColumnarPredictionRequest, version: Optional[int] = None,
+                           accept: Optional[str] = Header(None)):
+    """Make batch predictions from one array per feature or a row-major matrix"""
+    response_format = negotiate(accept)
+    try:
+        predictions, model_version = await run_in_threadpool(
+            model_service.predict_columnar, request.columns, request.rows, request.feature_names, version
+        )
+        if response_format != "json":
+            response = table_response(response_format, {"predicted_salary": predictions})
+            response.headers["X-Model-Version"] = str(model_version)
+            return response
+        return ColumnarPredictionResponse(predictions=predictions.tolist(), count=len(predictions), version=model_version)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error making batch predictions: {str(e)}")
+
+def _read_chunks(file_path: str, extension: str):
+    if extension == ".csv":
+        return pd.read_csv(file_path, chunksize=BULK_CHUNK_ROWS)
+    return pd.read_json(file_path, lines=True, chunksize=BULK_CHUNK_ROWS)
+
+def _format_error(message: str, extension: str) -> str:
+    """The trailing record that marks a stream cut short by an error"""
+    if extension == ".csv":
+        return f"{BULK_ERROR_MARKER}{message}\n"
+    return json.dumps({"error": message}) + "\n"
+
+def _format_chunks(first, scored: Iterator, reader, extension: str, file_path: str) -> Iterator[str]:
+    """Serialise scored chunks as they are produced, removing the spooled file at the end"""
+    try:
+        for i, (chunk, predictions) in enumerate(itertools.chain([first], scored)):
+            chunk = chunk.assign(predicted_salary=predictions)
+            if extension == ".csv":
+                yield chunk.to_csv(index=False, header=i == 0)
+            else:
+                yield chunk.to_json(orient="records", lines=True)
+    except Exception as e:
+        # The 200 has already been sent, so the only way left to report the failure is in the body
+        yield _format_error(f"Error making bulk predictions: {str(e)}", extension)
+    finally:
+        scored.close()
+        reader.close()
+        os.remove(file_path)
+
+@router.post("/bulk")
+async def predict_bulk(file: UploadFile = File(...), version: Optional[int] = None):
+    """Score a CSV or NDJSON file in chunks, streaming the rows back with predicted_salary"""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in BULK_FORMATS:
+        raise HTTPException(status_code=400, detail="Only CSV and NDJSON files are allowed")
+    
+    # The upload is closed once this handler returns, so spool it to a file the stream can read
+    os.makedirs("temp", exist_ok=True)
+    fd, file_path = tempfile.mkstemp(suffix=extension, dir="temp")
+    reader = None
+    streaming = False
+    
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            await run_in_threadpool(shutil.copyfileobj, file.file, buffer, BULK_COPY_SIZE)
+        
+        # Score the first chunk before responding, so a file with missing or non-numeric
+        # feature columns is refused with a proper status code
+        reader = _read_chunks(file_path, extension)
+        scored = model_service.predict_chunks(reader, version)
+        first = await run_in_threadpool(next, scored, None)
+        if first is None:
+            raise ValueError("File contains no rows")
+        
+        streaming = True
+        return StreamingResponse(
+            _format_chunks(first, scored, reader, extension, file_path),
+            media_type=BULK_FORMATS[extension]
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error making bulk predictions: {str(e)}")
+    finally:
+        if not streaming:
+            if reader is not None:
+                reader.close()
+            os.remove(file_path)
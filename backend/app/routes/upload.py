@@ -1,14 +1,59 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models.schemas import DataUploadResponse, DataStats
+from fastapi import APIRouter, UploadFile, File, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
+from app.models.schemas import DataUploadResponse, DataStats, CleanDataRequest, DataAppendResponse, JobSubmitResponse
 from app.services.data_service import DataService
+from app.services.job_service import JobService, Job
+from app.utils.serialization import negotiate, table_response
+import aiofiles
+import hashlib
 import os
-import shutil
-from typing import List, Dict, Any
+import tempfile
+import pandas as pd
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 data_service = DataService()
+job_service = JobService()
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "0"))  # 0 disables the limit
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+async def _save_upload(file: UploadFile, file_path: str) -> str:
+    """Stream an uploaded file to disk in fixed-size chunks and return its SHA-256"""
+    file_size = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            if MAX_FILE_SIZE and file_size > MAX_FILE_SIZE:
+                raise HTTPException(status_code=413, detail=f"File size exceeds {MAX_FILE_SIZE} bytes")
+            digest.update(chunk)
+            await buffer.write(chunk)
+    return digest.hexdigest()
+
+def _upload_path(upload_dir: str) -> str:
+    """Reserve a fresh file for one upload, so concurrent uploads with the same name never share it"""
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, file_path = tempfile.mkstemp(suffix=".csv", dir=upload_dir)
+    os.close(fd)
+    return file_path
+
+def _describe_dataset(dataset_id: str) -> Dict[str, Any]:
+    """Build the upload response fields for a dataset"""
+    return {
+        "dataset_id": dataset_id,
+        **data_service.get_summary(dataset_id),
+        "preview": data_service.get_preview(5, dataset_id),
+        "cleaning_report": data_service.get_cleaning_report(dataset_id)
+    }
+
+def _process_upload(file_path: str, digest: str, filename: str) -> Dict[str, Any]:
+    """Parse and clean a saved upload (runs in a worker thread)"""
+    data_service.load_upload(file_path, digest, filename=filename)
+    return _describe_dataset(digest)
 
 @router.post("/csv", response_model=DataUploadResponse)
 async def upload_csv(file: UploadFile = File(...)):
@@ -18,53 +63,138 @@ async def upload_csv(file: UploadFile = File(...)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
     
-    # Validate file size
-    file.file.seek(0, 2)  # Move to end of file
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail=f"File size exceeds {MAX_FILE_SIZE} bytes")
-    
-    # Save uploaded file
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    file_path = os.path.join(upload_dir, file.filename)
+    # Save uploaded file; concurrent requests with the same name must not write into one file
+    filename = os.path.basename(file.filename)
+    file_path = _upload_path("uploads")
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Load and process data
-        df = data_service.load_data(file_path)
+        # Save the body without blocking the event loop
+        digest = await _save_upload(file, file_path)
         
-        # Clean data
-        df = data_service.clean_data()
-        
-        # Get preview
-        preview = data_service.get_preview(5)
+        # Parse and clean off the event loop, or reuse the cached copy
+        result = await run_in_threadpool(_process_upload, file_path, digest, filename)
         
         return DataUploadResponse(
             message="File uploaded and processed successfully",
-            filename=file.filename,
-            rows=len(df),
-            columns=len(df.columns),
-            column_names=df.columns.tolist(),
-            preview=preview
+            filename=filename,
+            **result
         )
     
+    except HTTPException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
     except Exception as e:
         # Clean up file on error
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+def _upload_job(job: Job, file_path: str, digest: str, filename: str) -> Dict[str, Any]:
+    """Parse and clean a saved upload as a background job, reporting progress"""
+    try:
+        data_service.load_upload(file_path, digest, progress=job.checkpoint, commit=job.commit, filename=filename)
+        return {
+            "message": "File uploaded and processed successfully",
+            "filename": filename,
+            **_describe_dataset(digest)
+        }
+    except BaseException:
+        # Only this job's own copy; other uploads never share the path
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+@router.post("/csv/async", response_model=JobSubmitResponse, status_code=202)
+async def upload_csv_async(file: UploadFile = File(...)):
+    """Upload a CSV file and process it in the background"""
+    
+    # Validate file type
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    
+    # The job reads the file later; a path of its own keeps a same-name upload from replacing it
+    file_path = _upload_path("uploads")
+    
+    try:
+        digest = await _save_upload(file, file_path)
+    except HTTPException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    except Exception as e:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+    
+    job = job_service.submit("upload", _upload_job, file_path, digest, os.path.basename(file.filename))
+    return JobSubmitResponse(
+        job_id=job.job_id,
+        kind=job.kind,
+        status=job.status,
+        status_url=f"/api/jobs/{job.job_id}"
+    )
+
+def _process_append(file_path: str, dataset_id: Optional[str]) -> Dict[str, Any]:
+    """Parse appended rows and merge them into a dataset (runs in a worker thread)"""
+    new_rows = pd.read_csv(file_path)
+    return data_service.append_data(new_rows, dataset_id)
+
+@router.post("/append", response_model=DataAppendResponse)
+async def append_csv(file: UploadFile = File(...), dataset_id: Optional[str] = None):
+    """Append the rows of a CSV file to an existing dataset"""
+    
+    # Validate file type
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    
+    temp_dir = "temp"
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    file_path = os.path.join(temp_dir, os.path.basename(file.filename))
+    
+    try:
+        await _save_upload(file, file_path)
+        result = await run_in_threadpool(_process_append, file_path, dataset_id)
+        return DataAppendResponse(message="Rows appended successfully", **result)
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error appending rows: {str(e)}")
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+@router.post("/clean", response_model=DataUploadResponse)
+async def clean_dataset(request: CleanDataRequest):
+    """Re-clean a dataset from its original rows with the given outlier strategy"""
+    try:
+        await run_in_threadpool(
+            data_service.clean_data,
+            request.dataset_id,
+            strategy=request.strategy,
+            threshold=request.threshold,
+            from_original=True
+        )
+        dataset_id = request.dataset_id or data_service.get_dataset_id()
+        return DataUploadResponse(
+            message="Data cleaned successfully",
+            filename=data_service.get_filename(dataset_id),
+            **_describe_dataset(dataset_id)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cleaning data: {str(e)}")
+
 @router.get("/stats", response_model=DataStats)
-async def get_data_stats():
+async def get_data_stats(dataset_id: Optional[str] = None):
     """Get statistics about the uploaded data"""
     try:
-        stats = data_service.get_stats()
+        stats = data_service.get_stats(dataset_id)
         return DataStats(**stats)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -72,12 +202,44 @@ async def get_data_stats():
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
 @router.get("/preview")
-async def get_data_preview(rows: int = 10):
+async def get_data_preview(rows: int = 10, dataset_id: Optional[str] = None, accept: Optional[str] = Header(None)):
     """Get a preview of the uploaded data"""
+    response_format = negotiate(accept)
     try:
-        preview = data_service.get_preview(rows)
+        if response_format != "json":
+            preview_df = data_service.get_preview_frame(rows, dataset_id)
+            return table_response(response_format, {col: preview_df[col] for col in preview_df.columns})
+        preview = data_service.get_preview(rows, dataset_id)
         return {"preview": preview, "count": len(preview)}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting preview: {str(e)}")
+
+@router.get("/datasets")
+async def list_datasets():
+    """List previously uploaded datasets"""
+    try:
+        datasets = data_service.list_datasets()
+        return {
+            "datasets": datasets,
+            "count": len(datasets),
+            "memory": data_service.get_memory_usage()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing datasets: {str(e)}")
+
+@router.post("/datasets/{dataset_id}/select", response_model=DataUploadResponse)
+async def select_dataset(dataset_id: str):
+    """Load a previously uploaded dataset from the cache"""
+    try:
+        await run_in_threadpool(data_service.load_cached, dataset_id)
+        return DataUploadResponse(
+            message="Dataset loaded from cache",
+            filename=data_service.get_filename(dataset_id),
+            **_describe_dataset(dataset_id)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading dataset: {str(e)}")
@@ -1,18 +1,21 @@
 from fastapi import APIRouter, HTTPException
 from app.services.data_service import DataService
 from app.services.visualization_service import VisualizationService
-from typing import Dict
+from typing import Dict, Optional
 
 router = APIRouter()
 data_service = DataService()
 viz_service = VisualizationService()
 
 @router.get("/all")
-async def get_all_visualizations():
+async def get_all_visualizations(dataset_id: Optional[str] = None):
     """Get all visualizations for the uploaded data"""
     try:
-        data = data_service.get_data()
-        visualizations = viz_service.create_all_visualizations(data)
+        visualizations = data_service.memoize(
+            ("visualization", "all"),
+            viz_service.create_all_visualizations,
+            dataset_id
+        )
         
         return {
             "message": "Visualizations created successfully",
@@ -24,13 +27,11 @@ async def get_all_visualizations():
         raise HTTPException(status_code=500, detail=f"Error creating visualizations: {str(e)}")
 
 @router.get("/scatter")
-async def get_scatter_plot(x_column: str = None, y_column: str = None):
+async def get_scatter_plot(x_column: str = None, y_column: str = None, dataset_id: Optional[str] = None):
     """Get scatter plot"""
     try:
-        data = data_service.get_data()
-        
         # Auto-detect columns if not provided
-        numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = data_service.get_numeric_columns(dataset_id)
         
         if not x_column and len(numeric_cols) > 0:
             x_column = numeric_cols[0]
@@ -40,7 +41,11 @@ async def get_scatter_plot(x_column: str = None, y_column: str = None):
         if not x_column or not y_column:
             raise ValueError("Not enough numeric columns for scatter plot")
         
-        image = viz_service.create_scatter_plot(data, x_column, y_column)
+        image = data_service.memoize(
+            ("visualization", "scatter", x_column, y_column),
+            lambda data: viz_service.create_scatter_plot(data, x_column, y_column),
+            dataset_id
+        )
         
         return {
             "image": image,
@@ -53,20 +58,22 @@ async def get_scatter_plot(x_column: str = None, y_column: str = None):
         raise HTTPException(status_code=500, detail=f"Error creating scatter plot: {str(e)}")
 
 @router.get("/boxplot")
-async def get_box_plot(column: str = None):
+async def get_box_plot(column: str = None, dataset_id: Optional[str] = None):
     """Get box plot"""
     try:
-        data = data_service.get_data()
-        
         # Auto-detect column if not provided
         if not column:
-            numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
+            numeric_cols = data_service.get_numeric_columns(dataset_id)
             if len(numeric_cols) > 0:
                 column = numeric_cols[-1]  # Use last numeric column (likely target)
             else:
                 raise ValueError("No numeric columns found")
         
-        image = viz_service.create_box_plot(data, column)
+        image = data_service.memoize(
+            ("visualization", "boxplot", column),
+            lambda data: viz_service.create_box_plot(data, column),
+            dataset_id
+        )
         
         return {
             "image": image,
@@ -78,11 +85,14 @@ async def get_box_plot(column: str = None):
         raise HTTPException(status_code=500, detail=f"Error creating box plot: {str(e)}")
 
 @router.get("/heatmap")
-async def get_heatmap():
+async def get_heatmap(dataset_id: Optional[str] = None):
     """Get correlation heatmap"""
     try:
-        data = data_service.get_data()
-        image = viz_service.create_heatmap(data)
+        image = data_service.memoize(
+            ("visualization", "heatmap"),
+            viz_service.create_heatmap,
+            dataset_id
+        )
         
         return {
             "image": image
@@ -93,20 +103,22 @@ async def get_heatmap():
         raise HTTPException(status_code=500, detail=f"Error creating heatmap: {str(e)}")
 
 @router.get("/histogram")
-async def get_histogram(column: str = None, bins: int = 30):
+async def get_histogram(column: str = None, bins: int = 30, dataset_id: Optional[str] = None):
     """Get histogram"""
     try:
-        data = data_service.get_data()
-        
         # Auto-detect column if not provided
         if not column:
-            numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
+            numeric_cols = data_service.get_numeric_columns(dataset_id)
             if len(numeric_cols) > 0:
                 column = numeric_cols[-1]  # Use last numeric column (likely target)
             else:
                 raise ValueError("No numeric columns found")
         
-        image = viz_service.create_histogram(data, column, bins)
+        image = data_service.memoize(
+            ("visualization", "histogram", column, bins),
+            lambda data: viz_service.create_histogram(data, column, bins),
+            dataset_id
+        )
         
         return {
             "image": image,
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, List, Any, Optional, Tuple
+from app.services.model_service import ModelService
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))  # Longest a request waits for others to join its batch
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+ARRIVAL_SMOOTHING = 0.2  # Weight of the newest gap in the moving average of inter-arrival times
+
+class PredictionBatcher:
+    """Coalesces concurrent single predictions into one predict_batch call per model version"""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PredictionBatcher, cls).__new__(cls)
+            cls._instance._model_service = ModelService()
+            cls._instance._pending = {}  # version -> [(features, future)]
+            cls._instance._timers = {}
+            cls._instance._running = set()  # Batches being predicted, kept referenced until done
+            cls._instance._last_arrival = None
+            cls._instance._gap = None
+        return cls._instance
+    
+    def _observe_arrival(self):
+        now = time.perf_counter()
+        if self._last_arrival is not None:
+            # Cap idle gaps so the average reacts quickly when a burst starts
+            gap = min(now - self._last_arrival, 10 * BATCH_WINDOW_MS / 1000)
+            self._gap = gap if self._gap is None else (1 - ARRIVAL_SMOOTHING) * self._gap + ARRIVAL_SMOOTHING * gap
+        self._last_arrival = now
+    
+    def _window(self) -> float:
+        """Seconds to hold a new batch open, from the recent arrival rate"""
+        window = BATCH_WINDOW_MS / 1000
+        # When requests arrive further apart than the window, waiting only adds latency
+        if self._gap is None or self._gap >= window:
+            return 0.0
+        return window
+    
+    async def predict(self, features: Dict[str, float], version: Optional[int] = None) -> float:
+        """Predict one row, sharing a model call with requests that arrive at about the same time"""
+        self._observe_arrival()
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(version, [])
+        batch.append((features, future))
+        
+        if len(batch) >= BATCH_MAX_SIZE:
+            self._flush(version)
+        elif len(batch) == 1:
+            # With no wait, still pick up requests that are ready on this turn of the event loop
+            loop = asyncio.get_running_loop()
+            window = self._window()
+            self._timers[version] = loop.call_later(window, self._flush, version) if window > 0 else loop.call_soon(self._flush, version)
+        return await future
+    
+    def _flush(self, version: Optional[int]):
+        timer = self._timers.pop(version, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(version, [])
+        if not batch:
+            return
+        
+        # Requests arriving while this batch is predicted start the next one
+        task = asyncio.get_running_loop().create_task(self._run(batch, version))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+    
+    async def _run(self, batch: List[Tuple[Dict[str, float], asyncio.Future]], version: Optional[int]):
+        """Predict a batch off the event loop, then resolve its requests"""
+        try:
+            results = await run_in_threadpool(self._predict, [features for features, _ in batch], version)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            # The client may have gone away while waiting
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def _predict(self, features_list: List[Dict[str, float]], version: Optional[int]) -> List[Any]:
+        try:
+            return self._model_service.predict_batch(features_list, version)
+        except Exception:
+            # Retry row by row so one bad request does not fail the rest of its batch
+            results = []
+            for features in features_list:
+                try:
+                    results.append(self._model_service.predict(features, version))
+                except Exception as e:
+                    results.append(e)
+            return results
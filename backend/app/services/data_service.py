@@ -1,133 +1,1003 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Tuple
+from collections import OrderedDict
+from pandas.core.dtypes.cast import find_common_type
+from typing import Dict, List, Any, Optional, Tuple, Callable, Hashable, Iterator
+import logging
 import os
+import threading
+from app.services.dataset_cache import DatasetCache, CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+CSV_CHUNK_ROWS = 100_000
+DATASET_SUMMARY_KEYS = ("dataset_id", "filename", "rows", "columns", "created_at")
+CATEGORY_MAX_RATIO = 0.5  # Max unique/total ratio for category encoding
+OUTLIER_THRESHOLDS = {"iqr": 1.5, "zscore": 3.0, "mad": 3.5}  # Default threshold per strategy
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+MEMO_MAX_ENTRIES = 128  # Derived results cached per dataset version
+REBOUND_FRACTION = 0.1  # Re-fit cleaning rules once appends exceed this share of the fitted rows
+DATASET_MEMORY_BUDGET = int(os.getenv("DATASET_MEMORY_BUDGET", str(2 * 1024 ** 3)))  # 2GB
+# Changed datasets are written here, so the entry keyed by an upload's bytes always matches them
+WORKING_DIR = os.path.join(CACHE_DIR, "working")
+
+# Copy-on-write lets readers share the stored frames: a snapshot only
+# copies the columns a caller actually modifies
+pd.set_option("mode.copy_on_write", True)
+
+def _optimal_dtype(series: pd.Series):
+    """Pick the smallest dtype that represents a column without loss, or None to keep it"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    
+    if pd.api.types.is_integer_dtype(dtype):
+        has_missing = bool(series.isna().any())
+        fits_int32 = series.dropna().between(INT32_MIN, INT32_MAX).all()
+        if has_missing:
+            return "Int32" if fits_int32 and dtype != "Int32" else None
+        if fits_int32:
+            return None if dtype == np.int32 else np.int32
+        return dtype.numpy_dtype if isinstance(dtype, pd.api.extensions.ExtensionDtype) else None
+    
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = values[~np.isnan(values)]
+        # Integer columns with gaps are parsed as float; restore them as nullable ints
+        if (present.size < values.size and np.array_equal(present, np.round(present))
+                and (present.size == 0 or (present.min() >= INT32_MIN and present.max() <= INT32_MAX))):
+            return "Int32"
+        if dtype == np.float64 and np.array_equal(values.astype(np.float32), values, equal_nan=True):
+            return np.float32
+        return None
+    
+    if dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string":
+        if series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+            return "category"
+    return None
+
+def _finite_or_none(value: float) -> Optional[float]:
+    """JSON-safe float: unbounded limits are reported as null"""
+    return float(value) if np.isfinite(value) else None
+
+def fill_missing(df: pd.DataFrame, fill_values: pd.Series) -> pd.DataFrame:
+    """Fill missing numeric values in one call, widening integer columns when needed"""
+    if fill_values.empty:
+        return df
+    
+    widen = [
+        col for col, value in fill_values.items()
+        if pd.api.types.is_integer_dtype(df[col]) and value != int(value)
+    ]
+    if widen:
+        df = df.astype({col: np.float64 for col in widen})
+    return df.fillna(fill_values.to_dict())
+
+def outlier_bounds(numeric: pd.DataFrame, strategy: str = "iqr",
+                   threshold: Optional[float] = None) -> Tuple[pd.Series, pd.Series]:
+    """Compute per-column outlier bounds for all numeric columns at once"""
+    if strategy not in OUTLIER_THRESHOLDS:
+        raise ValueError(f"Unknown outlier strategy: {strategy}")
+    if threshold is None:
+        threshold = OUTLIER_THRESHOLDS[strategy]
+    
+    if strategy == "iqr":
+        quartiles = numeric.quantile([0.25, 0.75])
+        q1, q3 = quartiles.loc[0.25], quartiles.loc[0.75]
+        spread = q3 - q1
+        return q1 - threshold * spread, q3 + threshold * spread
+    
+    if strategy == "zscore":
+        center = numeric.mean()
+        spread = numeric.std()
+    else:
+        # Modified z-score: 0.6745 scales the MAD to a normal standard deviation
+        center = numeric.median()
+        spread = (numeric - center).abs().median() / 0.6745
+    
+    # A zero spread would flag every non-central value; leave such columns unfiltered
+    spread = spread.where(spread > 0, np.inf)
+    return center - threshold * spread, center + threshold * spread
+
+def outlier_flags(numeric: pd.DataFrame, lower: pd.Series, upper: pd.Series) -> pd.DataFrame:
+    """Flag values outside their column's bounds"""
+    flags = numeric.lt(lower, axis=1) | numeric.gt(upper, axis=1)
+    # Nullable columns compare to a masked boolean dtype; normalise to plain bool
+    return flags.astype(bool)
+
+def cleaning_summary(strategy: str, threshold: Optional[float], fill_values: pd.Series, missing: pd.Series,
+                     lower: pd.Series, upper: pd.Series, outliers: pd.Series, rows_before: int,
+                     rows_after_missing: int, rows_after: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Build the fitted cleaning rules and the cleaning report"""
+    rules = {
+        "strategy": strategy,
+        "threshold": threshold if threshold is not None else OUTLIER_THRESHOLDS[strategy],
+        "fill_values": {col: float(value) for col, value in fill_values.items()},
+        "lower": {col: float(value) for col, value in lower.items()},
+        "upper": {col: float(value) for col, value in upper.items()}
+    }
+    report = {
+        "strategy": strategy,
+        "threshold": rules["threshold"],
+        "rows_before": rows_before,
+        "missing_filled": {col: int(n) for col, n in missing.items() if n > 0},
+        "rows_dropped_missing": rows_before - rows_after_missing,
+        "outliers_flagged": {col: int(n) for col, n in outliers.items()},
+        "rows_dropped_outliers": rows_after_missing - rows_after,
+        "rows_after": rows_after,
+        "bounds": {
+            col: {"lower": _finite_or_none(lower[col]), "upper": _finite_or_none(upper[col])}
+            for col in missing.index
+        }
+    }
+    return rules, report
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast numeric columns and encode low-cardinality strings as categories"""
+    dtypes = {}
+    for col in df.columns:
+        dtype = _optimal_dtype(df[col])
+        if dtype is not None:
+            dtypes[col] = dtype
+    return df.astype(dtypes) if dtypes else df
+
+def read_csv_chunks(filepath: str, chunksize: int, phase: str, progress: Optional[Callable[..., None]] = None,
+                    dtype: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """Parse a CSV in bounded-size chunks, yielding each with the share of the file read so far"""
+    total_bytes = os.path.getsize(filepath)
+    rows_parsed = 0
+    with open(filepath, "rb") as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize, dtype=dtype):
+            rows_parsed += len(chunk)
+            if progress is not None:
+                progress(phase, bytes_parsed=f.tell(), total_bytes=total_bytes, rows_parsed=rows_parsed)
+            yield chunk, f.tell() / total_bytes if total_bytes else 1.0
+
+class DtypeProfile:
+    """Column statistics folded in chunk by chunk, enough to pick the dtypes
+    optimize_dtypes would choose for all the chunks concatenated"""
+    
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, Dict[str, Any]] = {}
+    
+    def update(self, chunk: pd.DataFrame, expected_rows: float):
+        """Fold in one chunk; expected_rows estimates the final row count, bounding the distinct strings kept"""
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            series = chunk[col]
+            stats = self.columns.get(col)
+            if stats is None:
+                stats = self.columns[col] = {
+                    "dtype": series.dtype, "missing": 0, "min": np.inf, "max": -np.inf,
+                    "integral": True, "float32": True, "strings": False, "non_strings": False, "uniques": set()
+                }
+            else:
+                # The dtype pd.concat would give the chunks so far
+                stats["dtype"] = find_common_type([stats["dtype"], series.dtype])
+            stats["missing"] += int(series.isna().sum())
+            
+            dtype = series.dtype
+            if dtype == object:
+                inferred = pd.api.types.infer_dtype(series, skipna=True)
+                if inferred == "string":
+                    stats["strings"] = True
+                    if stats["uniques"] is not None:
+                        stats["uniques"].update(series.dropna().unique())
+                        # Too many distinct values to become a category; stop collecting them
+                        if len(stats["uniques"]) > CATEGORY_MAX_RATIO * max(expected_rows, self.rows):
+                            stats["uniques"] = None
+                elif inferred != "empty":
+                    stats["non_strings"] = True
+                continue
+            if series.notna().any():
+                stats["non_strings"] = True
+            if (pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype)) \
+                    and not pd.api.types.is_bool_dtype(dtype):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                present = values[~np.isnan(values)]
+                if present.size:
+                    stats["min"] = min(stats["min"], present.min())
+                    stats["max"] = max(stats["max"], present.max())
+                stats["integral"] = stats["integral"] and np.array_equal(present, np.round(present))
+                stats["float32"] = stats["float32"] and np.array_equal(values.astype(np.float32), values, equal_nan=True)
+    
+    def parse_dtypes(self) -> Dict[str, Any]:
+        """The dtype of every column once all chunks are concatenated"""
+        return {col: stats["dtype"] for col, stats in self.columns.items()}
+    
+    def dtypes(self) -> Dict[str, Any]:
+        """The dtypes optimize_dtypes would change, following the rules of _optimal_dtype"""
+        dtypes = {}
+        for col, stats in self.columns.items():
+            dtype, missing = stats["dtype"], stats["missing"]
+            # Vacuously true for a column with no values: its limits are still infinite
+            fits_int32 = stats["min"] >= INT32_MIN and stats["max"] <= INT32_MAX
+            target = None
+            if pd.api.types.is_bool_dtype(dtype):
+                pass
+            elif pd.api.types.is_integer_dtype(dtype):
+                if missing:
+                    target = "Int32" if fits_int32 and dtype != "Int32" else None
+                elif fits_int32:
+                    target = None if dtype == np.int32 else np.int32
+                elif isinstance(dtype, pd.api.extensions.ExtensionDtype):
+                    target = dtype.numpy_dtype
+            elif pd.api.types.is_float_dtype(dtype):
+                if missing and stats["integral"] and fits_int32:
+                    target = "Int32"
+                elif dtype == np.float64 and stats["float32"]:
+                    target = np.float32
+            elif (dtype == object and stats["strings"] and not stats["non_strings"]
+                    and stats["uniques"] is not None
+                    and len(stats["uniques"]) <= CATEGORY_MAX_RATIO * self.rows):
+                target = pd.CategoricalDtype(sorted(stats["uniques"]))
+            if target is not None:
+                dtypes[col] = target
+        return dtypes
+
+def column_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    """Running aggregates (row count, per-column missing counts and numeric sums/extremes)"""
+    numeric = df.select_dtypes(include=[np.number])
+    sums, mins, maxs, counts = numeric.sum(), numeric.min(), numeric.max(), numeric.count()
+    return {
+        "rows": len(df),
+        "missing": {col: int(n) for col, n in df.isnull().sum().items()},
+        "numeric": {
+            col: {
+                "count": int(counts[col]),
+                "sum": float(sums[col]),
+                "min": float(mins[col]) if counts[col] else None,
+                "max": float(maxs[col]) if counts[col] else None
+            }
+            for col in numeric.columns
+        }
+    }
+
+def merge_aggregates(current: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the aggregates of two disjoint row sets"""
+    numeric = {}
+    for col, agg in current["numeric"].items():
+        new = delta["numeric"].get(col, {"count": 0, "sum": 0.0, "min": None, "max": None})
+        extremes = [v for v in (agg["min"], new["min"]) if v is not None]
+        highs = [v for v in (agg["max"], new["max"]) if v is not None]
+        numeric[col] = {
+            "count": agg["count"] + new["count"],
+            "sum": agg["sum"] + new["sum"],
+            "min": min(extremes) if extremes else None,
+            "max": max(highs) if highs else None
+        }
+    return {
+        "rows": current["rows"] + delta["rows"],
+        "missing": {
+            col: n + delta["missing"].get(col, 0) for col, n in current["missing"].items()
+        },
+        "numeric": numeric
+    }
+
+def conform_categories(base: pd.DataFrame, new: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Give categorical columns shared categories so the frames concatenate without falling back to object"""
+    base_updates, new_updates = {}, {}
+    for col, dtype in base.dtypes.items():
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        values = new[col].astype(object)
+        extra = pd.Index(values.dropna().unique()).difference(dtype.categories)
+        categories = dtype.categories.append(extra) if len(extra) else dtype.categories
+        if len(extra):
+            base_updates[col] = base[col].cat.set_categories(categories)
+        new_updates[col] = values.astype(pd.CategoricalDtype(categories))
+    if base_updates:
+        base = base.assign(**base_updates)
+    return base, new.assign(**new_updates) if new_updates else new
+
+def conform_numeric(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Parse new values of the base frame's numeric columns as numbers, rejecting any that are not"""
+    updates = {}
+    for col in base.select_dtypes(include=[np.number]).columns:
+        if pd.api.types.is_numeric_dtype(new[col]) or pd.api.types.is_bool_dtype(new[col]):
+            continue
+        values = pd.to_numeric(new[col], errors="coerce")
+        invalid = new[col][values.isna() & new[col].notna()]
+        if len(invalid):
+            raise ValueError(f"Column '{col}' has non-numeric values: {invalid.unique()[:5].tolist()}")
+        updates[col] = values
+    return new.assign(**updates) if updates else new
+
+def clean_frame(df: pd.DataFrame, strategy: str = "iqr",
+                threshold: Optional[float] = None) -> Tuple[pd.DataFrame, Dict[str, Any], Dict[str, Any]]:
+    """Clean a frame by handling missing values and outliers in a single pass, returning its rules and report"""
+    rows_before = len(df)
+    
+    # Handle missing values with one batched median computation
+    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    missing = df[numeric_columns].isnull().sum()
+    fill_values = df[numeric_columns].median()
+    df = fill_missing(df, fill_values[missing > 0])
+    
+    # Remove rows with any remaining missing values
+    df = df.dropna()
+    rows_after_missing = len(df)
+    
+    # Remove outliers with one combined mask across all numeric columns
+    lower, upper = outlier_bounds(df[numeric_columns], strategy, threshold)
+    flagged = outlier_flags(df[numeric_columns], lower, upper)
+    df = df[~flagged.to_numpy().any(axis=1)]
+    
+    # Filled columns no longer need nullable or float64 storage
+    df = optimize_dtypes(df)
+    
+    rules, report = cleaning_summary(
+        strategy, threshold, fill_values, missing, lower, upper, flagged.sum(),
+        rows_before, rows_after_missing, len(df)
+    )
+    return df, rules, report
+
+def conform_dtypes(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Give new numeric columns the base frame's dtypes wherever that loses nothing, so appends keep column dtypes"""
+    updates = {}
+    for col, dtype in base.dtypes.items():
+        values = new[col]
+        if (values.dtype == dtype or pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_bool_dtype(values.dtype)
+                or not pd.api.types.is_numeric_dtype(dtype) or not pd.api.types.is_numeric_dtype(values.dtype)):
+            continue
+        try:
+            cast = values.astype(dtype)
+        except (ValueError, TypeError, OverflowError):
+            # e.g. missing values into a plain integer column; the column has to widen
+            continue
+        # Narrowing can silently wrap or round; keep the cast only if every value survives it
+        if np.array_equal(cast.to_numpy(dtype=np.float64, na_value=np.nan),
+                          values.to_numpy(dtype=np.float64, na_value=np.nan), equal_nan=True):
+            updates[col] = cast
+    return new.assign(**updates) if updates else new
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Per-column memory in bytes before and after dtype optimisation"""
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    return {
+        col: {"before": int(before_bytes[col]), "after": int(after_bytes[col])}
+        for col in after.columns
+    }
+
+def select_features(df: pd.DataFrame, target_column: str) -> List[str]:
+    """Pick the model feature columns: every numeric column except the target"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    
+    if target_column not in numeric_cols:
+        raise ValueError(f"Target column '{target_column}' not found or not numeric")
+    
+    feature_cols = [col for col in numeric_cols if col != target_column]
+    
+    if not feature_cols:
+        # If no other numeric columns, look for 'Experience' or similar
+        if 'Experience' in df.columns:
+            feature_cols = ['Experience']
+        else:
+            raise ValueError("No suitable feature columns found")
+    
+    return feature_cols
+
+class Dataset:
+    """State of a single dataset held by the registry"""
+    
+    def __init__(self, dataset_id: str, filename: str):
+        self.dataset_id = dataset_id
+        self.filename = filename
+        self.original_data = None
+        self.data = None
+        self.nbytes = 0
+        self.memory_report = None
+        self.cleaning_rules = None
+        self.cleaning_report = None
+        self.aggregates = None
+        # Bumped on every change to the data; memoized results belong to one version
+        self.version = 0
+        # Bumped when rows are replaced rather than appended; within one
+        # generation earlier rows never change, so models can train on just the tail
+        self.generation = 0
+        self.memo = OrderedDict()
+        # Raw rows appended since the cleaning rules were last fitted
+        self.rows_since_rules = 0
+        # True when the in-memory frames differ from their copy on disk
+        self.dirty = False
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self.data is not None
+    
+    def measure(self):
+        """Recompute the memory held by this dataset's frames"""
+        nbytes = int(self.data.memory_usage(deep=True).sum())
+        if self.original_data is not self.data:
+            nbytes += int(self.original_data.memory_usage(deep=True).sum())
+        self.nbytes = nbytes
+    
+    def bump_version(self):
+        """Mark the data as changed, invalidating memoized results"""
+        self.version += 1
+        self.memo.clear()
+    
+    def refresh(self):
+        """Recompute memory use and running aggregates from scratch"""
+        self.measure()
+        self.aggregates = column_aggregates(self.data)
+    
+    def cache_meta(self) -> Dict[str, Any]:
+        """Extra metadata persisted alongside the cached frames"""
+        return {
+            "memory_report": self.memory_report,
+            "cleaning_rules": self.cleaning_rules,
+            "cleaning_report": self.cleaning_report,
+            "rows_since_rules": self.rows_since_rules,
+            "generation": self.generation
+        }
+    
+    def restore_meta(self, meta: Dict[str, Any]):
+        """Take back the fields persisted by cache_meta"""
+        self.memory_report = meta.get("memory_report")
+        self.cleaning_rules = meta.get("cleaning_rules")
+        self.cleaning_report = meta.get("cleaning_report")
+        self.rows_since_rules = meta.get("rows_since_rules", 0)
+        self.generation = meta.get("generation", 0)
+    
+    def unload(self):
+        """Drop the in-memory frames"""
+        self.original_data = None
+        self.data = None
+        self.aggregates = None
+        self.memo.clear()
+        self.nbytes = 0
 
 class DataService:
     """Service for handling data operations"""
     
     _instance = None
-    _data = None
-    _original_data = None
-    _filename = None
+    _datasets = None
+    _active_id = None
+    _lock = None
+    _cache = DatasetCache()
+    _working = DatasetCache(WORKING_DIR)
+    memory_budget = DATASET_MEMORY_BUDGET
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DataService, cls).__new__(cls)
+            cls._instance._datasets = OrderedDict()
+            cls._instance._lock = threading.RLock()
         return cls._instance
     
-    def load_data(self, filepath: str) -> pd.DataFrame:
-        """Load data from CSV file"""
+    def _resolve(self, dataset_id: Optional[str] = None, load: bool = True) -> Dataset:
+        """Look up a dataset (the active one by default), reloading it from disk if evicted unless load is False"""
+        with self._lock:
+            if dataset_id is None:
+                dataset_id = self._active_id
+                if dataset_id is None:
+                    raise ValueError("No data loaded")
+            
+            ds = self._datasets.get(dataset_id)
+            # Registering or reloading a dataset can push the registry over budget
+            changed = ds is None or (load and not ds.is_loaded)
+            if ds is None:
+                stored = self._stored(dataset_id)
+                if stored is None:
+                    raise ValueError(f"Dataset not found: {dataset_id}")
+                meta = stored.get_meta(dataset_id)
+                ds = Dataset(dataset_id, meta["filename"])
+                ds.restore_meta(meta)
+                self._datasets[dataset_id] = ds
+            
+            self._datasets.move_to_end(dataset_id)
+            if load and not ds.is_loaded:
+                original, cleaned, meta = self._stored(dataset_id).load(dataset_id)
+                ds.original_data = original
+                ds.data = cleaned
+                ds.restore_meta(meta)
+                ds.refresh()
+            if changed:
+                self._enforce_budget(keep=dataset_id)
+            return ds
+    
+    def _stored(self, dataset_id: str) -> Optional[DatasetCache]:
+        """The on-disk store holding a dataset's latest frames: its working copy once changed, else the upload"""
+        if self._working.has(dataset_id):
+            return self._working
+        return self._cache if self._cache.has(dataset_id) else None
+    
+    def _write_back(self, ds: Dataset) -> bool:
+        """Save changed frames to the dataset's working copy, leaving the upload's entry untouched"""
+        if ds.dirty:
+            if not self._working.save(ds.dataset_id, ds.original_data, ds.data, ds.filename, ds.cache_meta()):
+                return False
+            ds.dirty = False
+        return True
+    
+    def _register(self, ds: Dataset, original: Optional[pd.DataFrame] = None, data: Optional[pd.DataFrame] = None):
+        """Add a freshly stored dataset to the registry, resident when its frames are given, and make it active"""
+        with self._lock:
+            self._datasets[ds.dataset_id] = ds
+            self._datasets.move_to_end(ds.dataset_id)
+            self._active_id = ds.dataset_id
+            if data is not None:
+                ds.original_data = original
+                ds.data = data
+                ds.bump_version()
+                ds.refresh()
+            # Even a dataset kept on disk is now the one in use; the others give way to it
+            self._enforce_budget(keep=ds.dataset_id)
+    
+    def _evict(self, ds: Dataset) -> bool:
+        """Write a dataset back to its on-disk form and drop it from memory"""
+        if not self._write_back(ds):
+            return False
+        ds.unload()
+        return True
+    
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Evict least recently used datasets until the memory budget is met"""
+        with self._lock:
+            total = sum(ds.nbytes for ds in self._datasets.values())
+            for dataset_id, ds in list(self._datasets.items()):
+                if total <= self.memory_budget:
+                    break
+                if dataset_id == keep or not ds.is_loaded:
+                    continue
+                nbytes = ds.nbytes
+                if self._evict(ds):
+                    total -= nbytes
+                else:
+                    logger.warning("Dataset %s cannot be evicted; keeping it in memory", dataset_id)
+    
+    def _ingest(self, filepath: str, digest: str, chunksize: int = CSV_CHUNK_ROWS,
+                progress: Optional[Callable[..., None]] = None) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """Parse a CSV straight into its raw cache file, holding one chunk at a time
+        
+        A first pass profiles the columns, so the second can write every chunk
+        with the dtypes optimize_dtypes would pick for the whole file.
+        """
         try:
-            self._filename = os.path.basename(filepath)
-            df = pd.read_csv(filepath)
-            self._original_data = df.copy()
-            self._data = df.copy()
-            return df
+            profile = DtypeProfile()
+            for chunk, share in read_csv_chunks(filepath, chunksize, "profiling", progress):
+                profile.update(chunk, expected_rows=(profile.rows + len(chunk)) / share)
+            dtypes = profile.dtypes()
+            report = {col: {"before": 0, "after": 0} for col in profile.columns}
+            chunks = 0
+            
+            def optimized() -> Iterator[pd.DataFrame]:
+                nonlocal chunks
+                for chunk, _ in read_csv_chunks(filepath, chunksize, "parsing", progress, profile.parse_dtypes()):
+                    small = chunk.astype(dtypes) if dtypes else chunk
+                    for col, nbytes in chunk.memory_usage(deep=True, index=False).items():
+                        report[col]["before"] += int(nbytes)
+                    for col, nbytes in small.memory_usage(deep=True, index=False).items():
+                        report[col]["after"] += int(nbytes)
+                    chunks += 1
+                    yield small
+            
+            self._cache.write_batches(digest, "raw", optimized())
         except Exception as e:
             raise ValueError(f"Error loading data: {str(e)}")
+        
+        # Each chunk counted its categories, but a whole frame holds them once
+        for col, dtype in dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                report[col]["after"] -= (chunks - 1) * int(dtype.categories.memory_usage(deep=True))
+        return sum(stats["after"] for stats in report.values()), report
     
-    def clean_data(self) -> pd.DataFrame:
-        """Clean the data by handling missing values and outliers"""
-        if self._data is None:
-            raise ValueError("No data loaded")
+    def _clean_stored(self, digest: str, strategy: str = "iqr",
+                      threshold: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Clean a cached raw frame into its clean file a column at a time, like clean_frame but without loading it"""
+        cache = self._cache
+        columns = cache.read_schema(digest, "raw").empty_table().to_pandas()
+        numeric_columns = columns.select_dtypes(include=[np.number]).columns
         
-        df = self._data.copy()
+        # Rows survive the missing-value pass unless a non-numeric column, or a
+        # numeric one with no median to fill from, is missing there
+        keep = None
+        missing, fill_values = {}, {}
+        for col in columns.columns:
+            values = cache.read_column(digest, col, "raw")
+            if keep is None:
+                keep = np.ones(len(values), dtype=bool)
+            if col in numeric_columns:
+                missing[col] = int(values.isna().sum())
+                fill_values[col] = values.median()
+                if missing[col] and pd.isna(fill_values[col]):
+                    keep &= values.notna().to_numpy()
+            else:
+                keep &= values.notna().to_numpy()
+        missing = pd.Series(missing, index=numeric_columns, dtype=np.int64)
+        fill_values = pd.Series(fill_values, index=numeric_columns, dtype=np.float64)
+        fills = fill_values[missing > 0]
+        rows_after_missing = int(keep.sum())
         
-        # Handle missing values
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        # Outlier bounds are per column, so each is fitted on that column alone
+        outliers = np.zeros(rows_after_missing, dtype=bool)
+        lower, upper, flagged = {}, {}, {}
         for col in numeric_columns:
-            if df[col].isnull().any():
-                df[col].fillna(df[col].median(), inplace=True)
+            numeric = fill_missing(cache.read_column(digest, col, "raw")[keep].to_frame(), fills[fills.index == col])
+            col_lower, col_upper = outlier_bounds(numeric, strategy, threshold)
+            flags = outlier_flags(numeric, col_lower, col_upper)[col].to_numpy()
+            lower[col], upper[col], flagged[col] = col_lower[col], col_upper[col], int(flags.sum())
+            outliers |= flags
+        rows = keep
+        rows[keep] = ~outliers
         
-        # Remove rows with any remaining missing values
-        df.dropna(inplace=True)
+        def cleaned() -> Iterator[pd.DataFrame]:
+            start = 0
+            for batch in cache.iter_batches(digest, "raw"):
+                stop = start + len(batch)
+                yield fill_missing(batch[rows[start:stop]], fills)
+                start = stop
         
-        # Remove outliers using IQR method for numeric columns
-        for col in numeric_columns:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
-        
-        self._data = df
-        return df
+        # One pass picks the dtypes optimize_dtypes would give the whole cleaned frame, the next writes it
+        profile = DtypeProfile()
+        for batch in cleaned():
+            profile.update(batch, expected_rows=int(rows.sum()))
+        dtypes = profile.dtypes()
+        cache.write_batches(digest, "clean", (batch.astype(dtypes) if dtypes else batch for batch in cleaned()))
+        
+        return cleaning_summary(
+            strategy, threshold, fill_values, missing,
+            pd.Series(lower, index=numeric_columns, dtype=np.float64),
+            pd.Series(upper, index=numeric_columns, dtype=np.float64),
+            pd.Series(flagged, index=numeric_columns, dtype=np.int64),
+            len(keep), rows_after_missing, profile.rows
+        )
+    
+    def load_upload(self, filepath: str, digest: str, progress: Optional[Callable[..., None]] = None,
+                    commit: Optional[Callable[[], None]] = None, filename: Optional[str] = None):
+        """Load and clean an upload, reusing its cached columnar form when present
+        
+        The CSV is streamed into the cache chunk by chunk; the frames stay in
+        memory only when both fit the memory budget, otherwise cleaning runs on
+        disk and the dataset is loaded on demand. progress may raise to abandon
+        the load at a phase boundary; commit is called, and may raise, just
+        before the dataset becomes visible. filename defaults to the file's own name.
+        """
+        filename = filename or os.path.basename(filepath)
+        if self._cache.has(digest):
+            if commit is not None:
+                commit()
+            self._restore_upload(digest, filename)
+            return
+        
+        try:
+            nbytes, report = self._ingest(filepath, digest, progress=progress)
+            if progress is not None:
+                progress("cleaning")
+            original = data = None
+            if 2 * nbytes <= self.memory_budget:
+                original = self._cache.read_frame(digest, "raw")
+                data, rules, cleaning_report = clean_frame(original)
+                self._cache.write_batches(digest, "clean", [data])
+            else:
+                rules, cleaning_report = self._clean_stored(digest)
+            
+            if progress is not None:
+                progress("caching", rows_cleaned=cleaning_report["rows_after"])
+            if commit is not None:
+                commit()
+        except BaseException:
+            # Frames without their metadata are never read; do not leave them behind
+            if not self._cache.has(digest):
+                self._cache.remove(digest)
+            raise
+        ds = Dataset(digest, filename)
+        ds.memory_report = report
+        ds.cleaning_rules = rules
+        ds.cleaning_report = cleaning_report
+        with self._lock:
+            previous = self._datasets.get(digest)
+            ds.generation = (previous.generation if previous is not None else 0) + 1
+            # Writing the metadata last is what makes the entry visible in the cache
+            self._cache.write_meta(digest, filename, cleaning_report["rows_after"], len(report), ds.cache_meta())
+            self._register(ds, original, data)
+    
+    def _restore_upload(self, digest: str, filename: str):
+        """Make a cached upload active exactly as uploaded, discarding appends and re-cleans made since"""
+        with self._lock:
+            ds = self._datasets.get(digest)
+            working = self._working.get_meta(digest)
+            if working is not None or (ds is not None and ds.dirty):
+                pristine = self._cache.get_meta(digest)
+                # Past every earlier generation, so models trained on the discarded rows cannot be extended
+                generation = 1 + max(
+                    pristine.get("generation", 0),
+                    ds.generation if ds is not None else 0,
+                    working.get("generation", 0) if working is not None else 0
+                )
+                self._working.remove(digest)
+                self._cache.update_meta(digest, generation=generation)
+                if ds is not None:
+                    ds.unload()
+                    ds.dirty = False
+                    ds.bump_version()
+                    ds.restore_meta(self._cache.get_meta(digest))
+            
+            ds = self._resolve(digest, load=False)
+            ds.filename = filename
+            self._active_id = digest
+    
+    def load_cached(self, digest: str):
+        """Make a previously uploaded dataset the active one; its frames are loaded on first use"""
+        with self._lock:
+            self._resolve(digest, load=False)
+            self._active_id = digest
+    
+    def list_datasets(self) -> List[Dict[str, Any]]:
+        """List datasets known to the registry or the on-disk cache"""
+        with self._lock:
+            # Working copies report the rows of the changed data
+            datasets = {
+                meta["dataset_id"]: {key: meta[key] for key in DATASET_SUMMARY_KEYS if key in meta}
+                for meta in self._cache.list_datasets() + self._working.list_datasets()
+            }
+            for dataset_id, ds in self._datasets.items():
+                meta = datasets.setdefault(dataset_id, {"dataset_id": dataset_id, "filename": ds.filename})
+                if ds.is_loaded:
+                    meta["rows"] = len(ds.data)
+                    meta["columns"] = len(ds.data.columns)
+            for dataset_id, meta in datasets.items():
+                ds = self._datasets.get(dataset_id)
+                meta["loaded"] = ds is not None and ds.is_loaded
+                meta["memory_bytes"] = ds.nbytes if ds is not None else 0
+                meta["active"] = dataset_id == self._active_id
+            return list(datasets.values())
+    
+    def get_memory_usage(self) -> Dict[str, int]:
+        """Get the registry's resident memory and budget in bytes"""
+        with self._lock:
+            return {
+                "used": sum(ds.nbytes for ds in self._datasets.values()),
+                "budget": self.memory_budget
+            }
     
-    def get_data(self) -> pd.DataFrame:
-        """Get the current data"""
-        if self._data is None:
-            raise ValueError("No data loaded")
-        return self._data.copy()
+    def get_filename(self, dataset_id: Optional[str] = None) -> Optional[str]:
+        """Get the filename of a dataset"""
+        return self._resolve(dataset_id, load=False).filename
     
-    def get_original_data(self) -> pd.DataFrame:
-        """Get the original unmodified data"""
-        if self._original_data is None:
-            raise ValueError("No data loaded")
-        return self._original_data.copy()
+    def get_dataset_id(self) -> Optional[str]:
+        """Get the id of the active dataset"""
+        return self._active_id
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get statistics about the data"""
-        if self._data is None:
-            raise ValueError("No data loaded")
+    def clean_data(self, dataset_id: Optional[str] = None, strategy: str = "iqr",
+                   threshold: Optional[float] = None, from_original: bool = False) -> pd.DataFrame:
+        """Clean the data by handling missing values and outliers in a single pass"""
+        ds = self._resolve(dataset_id)
+        df, ds.cleaning_rules, ds.cleaning_report = clean_frame(
+            ds.original_data if from_original else ds.data, strategy, threshold
+        )
+        ds.rows_since_rules = 0
+        self._replace_data(ds, df)
+        return self.get_data(ds.dataset_id)
+    
+    def get_cleaning_report(self, dataset_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get the report from the last clean of a dataset"""
+        return self._resolve(dataset_id, load=False).cleaning_report
+    
+    def _replace_data(self, ds: Dataset, df: pd.DataFrame):
+        """Swap in a new current frame; the only place a dataset's data changes"""
+        with self._lock:
+            ds.data = df
+            ds.dirty = True
+            ds.generation += 1
+            ds.bump_version()
+            ds.refresh()
+            self._enforce_budget(keep=ds.dataset_id)
+    
+    def append_data(self, new_rows: pd.DataFrame, dataset_id: Optional[str] = None) -> Dict[str, Any]:
+        """Append raw rows, cleaning only the new ones with the dataset's fitted rules"""
+        ds = self._resolve(dataset_id)
+        rules = ds.cleaning_rules
+        if rules is None:
+            raise ValueError("Dataset must be cleaned before rows can be appended")
+        
+        columns = ds.original_data.columns
+        missing_columns = set(columns) - set(new_rows.columns)
+        if missing_columns:
+            raise ValueError(f"Appended rows are missing columns: {sorted(missing_columns)}")
         
-        df = self._data
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_cols = df.select_dtypes(exclude=[np.number]).columns.tolist()
+        # Continue the raw index so cleaned rows keep pointing at their source rows
+        start = int(ds.original_data.index.max()) + 1 if len(ds.original_data) else 0
+        raw = conform_dtypes(ds.original_data, optimize_dtypes(conform_numeric(ds.original_data, new_rows[columns])))
+        raw.index = pd.RangeIndex(start, start + len(raw))
         
-        missing_values = df.isnull().sum().to_dict()
+        # Apply the existing fill values and bounds to the new rows only
+        numeric_columns = [col for col in rules["fill_values"] if col in columns]
+        cleaned = fill_missing(raw, pd.Series(rules["fill_values"])[numeric_columns].dropna())
+        cleaned = cleaned.dropna()
+        rows_after_missing = len(cleaned)
+        flagged = outlier_flags(
+            cleaned[numeric_columns],
+            pd.Series(rules["lower"])[numeric_columns],
+            pd.Series(rules["upper"])[numeric_columns]
+        )
+        cleaned = conform_dtypes(ds.data, optimize_dtypes(cleaned[~flagged.to_numpy().any(axis=1)]))
+        
+        with self._lock:
+            original, raw = conform_categories(ds.original_data, raw)
+            data, cleaned = conform_categories(ds.data, cleaned)
+            ds.original_data = pd.concat([original, raw])
+            ds.data = pd.concat([data, cleaned])
+            ds.dirty = True
+            ds.bump_version()
+            ds.nbytes += int(raw.memory_usage(deep=True).sum()) + int(cleaned.memory_usage(deep=True).sum())
+            ds.aggregates = merge_aggregates(ds.aggregates, column_aggregates(cleaned))
+            ds.rows_since_rules += len(raw)
+            
+            # Bounds only move noticeably once a sizeable share of rows is new
+            fitted_rows = ds.cleaning_report["rows_before"] if ds.cleaning_report else 0
+            reclean = ds.rows_since_rules > REBOUND_FRACTION * fitted_rows
+            if reclean:
+                self.clean_data(ds.dataset_id, rules["strategy"], rules["threshold"], from_original=True)
+            else:
+                self._enforce_budget(keep=ds.dataset_id)
         
         return {
-            "total_rows": len(df),
-            "total_columns": len(df.columns),
-            "missing_values": missing_values,
-            "numeric_columns": numeric_cols,
-            "categorical_columns": categorical_cols
+            "dataset_id": ds.dataset_id,
+            "rows_received": len(raw),
+            "rows_appended": len(cleaned),
+            "rows_dropped_missing": len(raw) - rows_after_missing,
+            "rows_dropped_outliers": rows_after_missing - len(cleaned),
+            "total_rows": len(ds.data),
+            "rules_refitted": reclean
         }
     
-    def get_preview(self, rows: int = 5) -> List[Dict[str, Any]]:
-        """Get a preview of the data"""
-        if self._data is None:
-            raise ValueError("No data loaded")
+    def memoize(self, key: Hashable, compute: Callable[[pd.DataFrame], Any],
+                dataset_id: Optional[str] = None) -> Any:
+        """Return a result derived from the current data, computing it once per dataset version"""
+        ds = self._resolve(dataset_id)
+        with self._lock:
+            version = ds.version
+            if key in ds.memo:
+                ds.memo.move_to_end(key)
+                return ds.memo[key]
+            data = ds.data.copy(deep=False)
         
-        preview_df = self._data.head(rows)
-        return preview_df.to_dict(orient='records')
+        # Compute outside the lock; a concurrent change simply discards the result
+        value = compute(data)
+        
+        with self._lock:
+            if ds.version == version and ds.is_loaded:
+                ds.memo[key] = value
+                while len(ds.memo) > MEMO_MAX_ENTRIES:
+                    ds.memo.popitem(last=False)
+        return value
     
-    def get_column_names(self) -> List[str]:
-        """Get column names"""
-        if self._data is None:
-            raise ValueError("No data loaded")
-        return self._data.columns.tolist()
+    def get_version(self, dataset_id: Optional[str] = None) -> int:
+        """Get the version of a dataset's current data"""
+        return self._resolve(dataset_id).version
     
-    def prepare_features(self, target_column: str = 'Salary') -> Tuple[pd.DataFrame, pd.Series]:
-        """Prepare features and target for ML"""
-        if self._data is None:
-            raise ValueError("No data loaded")
-        
-        df = self._data.copy()
-        
-        # Identify feature columns (all numeric columns except target)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        
-        if target_column not in numeric_cols:
-            raise ValueError(f"Target column '{target_column}' not found or not numeric")
+    def get_numeric_columns(self, dataset_id: Optional[str] = None) -> List[str]:
+        """Get the numeric column names of the current data"""
+        return self.memoize(
+            "numeric_columns",
+            lambda df: df.select_dtypes(include=[np.number]).columns.tolist(),
+            dataset_id
+        )
+    
+    def get_aggregates(self, dataset_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the running aggregates of the current data"""
+        return self._resolve(dataset_id).aggregates
+    
+    def get_data(self, dataset_id: Optional[str] = None) -> pd.DataFrame:
+        """Get a copy-on-write snapshot of the current data"""
+        return self._resolve(dataset_id).data.copy(deep=False)
+    
+    def get_original_data(self, dataset_id: Optional[str] = None) -> pd.DataFrame:
+        """Get a copy-on-write snapshot of the original unmodified data"""
+        return self._resolve(dataset_id).original_data.copy(deep=False)
+    
+    def get_stats(self, dataset_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get statistics about the data from its running aggregates"""
+        ds = self._resolve(dataset_id)
         
-        feature_cols = [col for col in numeric_cols if col != target_column]
+        def compute(df: pd.DataFrame) -> Dict[str, Any]:
+            aggregates = ds.aggregates
+            return {
+                "total_rows": aggregates["rows"],
+                "total_columns": len(df.columns),
+                "missing_values": dict(aggregates["missing"]),
+                "numeric_columns": list(aggregates["numeric"]),
+                "categorical_columns": [col for col in df.columns if col not in aggregates["numeric"]],
+                "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+                "memory_usage": ds.memory_report
+            }
         
-        if not feature_cols:
-            # If no other numeric columns, look for 'Experience' or similar
-            if 'Experience' in df.columns:
-                feature_cols = ['Experience']
+        return dict(self.memoize("stats", compute, ds.dataset_id))
+    
+    def get_preview(self, rows: int = 5, dataset_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a preview of the data"""
+        return self.get_preview_frame(rows, dataset_id).to_dict(orient='records')
+    
+    def get_preview_frame(self, rows: int = 5, dataset_id: Optional[str] = None) -> pd.DataFrame:
+        """Get the first rows of the data as a DataFrame, read from disk when the dataset is not in memory"""
+        with self._lock:
+            ds = self._resolve(dataset_id, load=False)
+            if ds.is_loaded:
+                return ds.data.head(rows)
+            return self._stored(ds.dataset_id).head(ds.dataset_id, rows)
+    
+    def get_summary(self, dataset_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the row count and column names of the data without loading it"""
+        with self._lock:
+            ds = self._resolve(dataset_id, load=False)
+            if ds.is_loaded:
+                rows, columns = len(ds.data), ds.data.columns.tolist()
             else:
-                raise ValueError("No suitable feature columns found")
+                stored = self._stored(ds.dataset_id)
+                rows = stored.get_meta(ds.dataset_id)["rows"]
+                columns = stored.read_schema(ds.dataset_id).names
+        return {"rows": rows, "columns": len(columns), "column_names": columns}
+    
+    def get_column_names(self, dataset_id: Optional[str] = None) -> List[str]:
+        """Get column names"""
+        return self.get_data(dataset_id).columns.tolist()
+    
+    def prepare_features(self, target_column: str = 'Salary', dataset_id: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """Prepare features and target for ML"""
+        X, y, _ = self.prepare_training_data(target_column, dataset_id)
+        return X, y
+    
+    def prepare_training_data(self, target_column: str = 'Salary',
+                              dataset_id: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series, Dict[str, Any]]:
+        """Prepare features and target along with the lineage of the snapshot they came from"""
+        ds = self._resolve(dataset_id)
+        with self._lock:
+            df = ds.data.copy(deep=False)
+            lineage = {"dataset_id": ds.dataset_id, "generation": ds.generation, "rows": len(df)}
+        feature_cols = select_features(df, target_column)
         
         X = df[feature_cols]
         y = df[target_column]
         
-        return X, y
+        return X, y, lineage
+    
+    def prepare_increment(self, lineage: Dict[str, Any], feature_cols: List[str],
+                          target_column: str = 'Salary') -> Tuple[pd.DataFrame, pd.Series, Dict[str, Any]]:
+        """Features and target of the rows appended since a training snapshot, plus the new lineage"""
+        ds = self._resolve(lineage["dataset_id"])
+        with self._lock:
+            df = ds.data.copy(deep=False)
+            generation = ds.generation
+        
+        if generation != lineage["generation"] or len(df) < lineage["rows"]:
+            raise ValueError("Dataset was re-cleaned or replaced since the model was trained; run a full train")
+        
+        delta = df.iloc[lineage["rows"]:]
+        current = {"dataset_id": ds.dataset_id, "generation": generation, "rows": len(df)}
+        return delta[feature_cols], delta[target_column], current
+    
+    def prepare_stream(self, target_column: str = 'Salary', dataset_id: Optional[str] = None) -> Dict[str, Any]:
+        """Flush a dataset to its on-disk form and describe it for out-of-core training"""
+        with self._lock:
+            if dataset_id is None:
+                dataset_id = self._active_id
+                if dataset_id is None:
+                    raise ValueError("No data loaded")
+            
+            # Write back in-memory changes; evicted datasets are streamed without reloading
+            ds = self._datasets.get(dataset_id)
+            if ds is not None and not self._write_back(ds):
+                raise ValueError("Dataset cannot be stored on disk for out-of-core training")
+            stored = self._stored(dataset_id)
+            if stored is None:
+                raise ValueError(f"Dataset not found: {dataset_id}")
+            schema = stored.read_schema(dataset_id)
+            meta = stored.get_meta(dataset_id)
+            generation = ds.generation if ds is not None else meta.get("generation", 0)
+        
+        return {
+            "dataset_id": dataset_id,
+            "cache_dir": stored.cache_dir,
+            "features": select_features(schema.empty_table().to_pandas(), target_column),
+            "target": target_column,
+            "lineage": {"dataset_id": dataset_id, "generation": generation, "rows": meta["rows"]}
+        }
     
-    def reset_data(self):
+    def reset_data(self, dataset_id: Optional[str] = None):
         """Reset data to original state"""
-        if self._original_data is not None:
-            self._data = self._original_data.copy()
+        ds = self._resolve(dataset_id)
+        self._replace_data(ds, ds.original_data)
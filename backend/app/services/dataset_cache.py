@@ -0,0 +1,208 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "uploads"
+RECORD_BATCH_ROWS = 100_000
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class DatasetCache:
+    """Content-addressed on-disk cache of parsed datasets in Arrow IPC format"""
+    
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+    
+    @staticmethod
+    def hash_file(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+        """Compute the SHA-256 content hash of a file"""
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _check_digest(digest: str):
+        if not DIGEST_PATTERN.match(digest):
+            raise ValueError(f"Invalid dataset id: {digest}")
+    
+    def _path(self, digest: str, kind: str) -> str:
+        self._check_digest(digest)
+        return os.path.join(self.cache_dir, f"{digest}.{kind}.arrow")
+    
+    def _meta_path(self, digest: str) -> str:
+        self._check_digest(digest)
+        return os.path.join(self.cache_dir, f"{digest}.json")
+    
+    def has(self, digest: str) -> bool:
+        """Check whether both the raw and cleaned frames are cached"""
+        return (
+            os.path.exists(self._meta_path(digest))
+            and os.path.exists(self._path(digest, "raw"))
+            and os.path.exists(self._path(digest, "clean"))
+        )
+    
+    def _write_frames(self, frames: Iterable[pd.DataFrame], path: str) -> int:
+        """Write frames with identical dtypes as one Arrow IPC file in bounded record batches"""
+        tmp_path = f"{path}.tmp"
+        rows = 0
+        writer = None
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                for df in frames:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        writer = ipc.new_file(sink, table.schema)
+                    for batch in table.to_batches(max_chunksize=RECORD_BATCH_ROWS):
+                        writer.write_batch(batch)
+                    rows += len(df)
+                if writer is None:
+                    raise ValueError("No rows to write")
+                writer.close()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+        return rows
+    
+    def _write_frame(self, df: pd.DataFrame, path: str):
+        """Write a frame as an Arrow IPC file in bounded record batches"""
+        self._write_frames([df], path)
+    
+    def write_batches(self, digest: str, kind: str, frames: Iterable[pd.DataFrame]) -> int:
+        """Stream frames into a cached frame as they are produced, returning the row count"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return self._write_frames(frames, self._path(digest, kind))
+    
+    def _read_frame(self, path: str) -> pd.DataFrame:
+        """Read an Arrow IPC file through a memory map"""
+        with pa.memory_map(path, "r") as source:
+            table = ipc.open_file(source).read_all()
+            # Convert while the map is open; the result owns writable memory
+            return table.to_pandas()
+    
+    def save(self, digest: str, original: pd.DataFrame, cleaned: pd.DataFrame, filename: str,
+             extra: Optional[Dict[str, Any]] = None) -> bool:
+        """Store the raw and cleaned frames for a content hash"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            self._write_frame(original, self._path(digest, "raw"))
+            self._write_frame(cleaned, self._path(digest, "clean"))
+        except (pa.ArrowException, ValueError, TypeError) as e:
+            # Columns with mixed Python types have no Arrow equivalent;
+            # such datasets simply stay uncached
+            logger.warning("Could not cache dataset %s: %s", digest, e)
+            return False
+        
+        self.write_meta(digest, filename, len(cleaned), len(cleaned.columns), extra)
+        return True
+    
+    def write_meta(self, digest: str, filename: str, rows: int, columns: int,
+                   extra: Optional[Dict[str, Any]] = None):
+        """Store the metadata of a content hash once its frames are written"""
+        meta = {
+            "dataset_id": digest,
+            "filename": filename,
+            "rows": rows,
+            "columns": columns,
+            "created_at": time.time()
+        }
+        meta.update(extra or {})
+        tmp_path = f"{self._meta_path(digest)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(digest))
+    
+    def update_meta(self, digest: str, **fields):
+        """Change fields of the stored metadata of a content hash"""
+        meta = self.get_meta(digest)
+        if meta is None:
+            raise ValueError(f"Dataset not found: {digest}")
+        meta.update(fields)
+        tmp_path = f"{self._meta_path(digest)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(digest))
+    
+    def load(self, digest: str) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+        """Load the raw frame, cleaned frame and metadata for a content hash"""
+        if not self.has(digest):
+            raise ValueError(f"Dataset not found: {digest}")
+        
+        with open(self._meta_path(digest)) as f:
+            meta = json.load(f)
+        original = self._read_frame(self._path(digest, "raw"))
+        cleaned = self._read_frame(self._path(digest, "clean"))
+        return original, cleaned, meta
+    
+    def read_frame(self, digest: str, kind: str = "clean") -> pd.DataFrame:
+        """Read one cached frame"""
+        return self._read_frame(self._path(digest, kind))
+    
+    def read_column(self, digest: str, column: str, kind: str = "clean") -> pd.Series:
+        """Read a single column of a cached frame; the others are never touched"""
+        with pa.memory_map(self._path(digest, kind), "r") as source:
+            table = ipc.open_file(source).read_all().select([column])
+            return table.to_pandas()[column]
+    
+    def head(self, digest: str, rows: int, kind: str = "clean") -> pd.DataFrame:
+        """Read the first rows of a cached frame"""
+        with pa.memory_map(self._path(digest, kind), "r") as source:
+            return ipc.open_file(source).read_all().slice(0, rows).to_pandas()
+    
+    def read_schema(self, digest: str, kind: str = "clean") -> pa.Schema:
+        """Read the column schema of a cached frame without loading its rows"""
+        with pa.memory_map(self._path(digest, kind), "r") as source:
+            return ipc.open_file(source).schema
+    
+    def num_batches(self, digest: str, kind: str = "clean") -> int:
+        """Count the record batches of a cached frame"""
+        with pa.memory_map(self._path(digest, kind), "r") as source:
+            return ipc.open_file(source).num_record_batches
+    
+    def iter_batches(self, digest: str, kind: str = "clean", columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Stream a cached frame one record batch at a time through a memory map"""
+        with pa.memory_map(self._path(digest, kind), "r") as source:
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                if columns is not None:
+                    table = table.select(columns)
+                yield table.to_pandas()
+    
+    def remove(self, digest: str):
+        """Delete the cached frames and metadata of a content hash"""
+        for path in (self._path(digest, "raw"), self._path(digest, "clean"), self._meta_path(digest)):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def get_meta(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Get the stored metadata for a content hash"""
+        if not self.has(digest):
+            return None
+        with open(self._meta_path(digest)) as f:
+            return json.load(f)
+    
+    def list_datasets(self) -> List[Dict[str, Any]]:
+        """List metadata for all cached datasets, newest first"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        
+        datasets = []
+        for name in os.listdir(self.cache_dir):
+            digest = name[:-len(".json")]
+            if name.endswith(".json") and DIGEST_PATTERN.match(digest):
+                meta = self.get_meta(digest)
+                if meta is not None:
+                    datasets.append(meta)
+        return sorted(datasets, key=lambda m: m["created_at"], reverse=True)
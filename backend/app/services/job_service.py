@@ -0,0 +1,260 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", "2"))
+JOB_HISTORY = 200  # Finished jobs kept for status polling
+POLL_INTERVAL = 0.1  # Seconds between checks on a worker process
+TERMINATE_TIMEOUT = 5.0
+
+class JobCancelled(BaseException):
+    """Raised inside a job once cancellation has been requested"""
+    # Like asyncio.CancelledError, not an Exception, so job code's generic error handling does not swallow it
+
+class JobNotCancellable(Exception):
+    """Raised when cancelling a job that has finished or passed its commit point"""
+
+def _process_main(conn, target: Callable[..., Any], args, kwargs):
+    """Worker process entry point: run target and send progress and the outcome back"""
+    def progress(phase: Optional[str] = None, **counters):
+        conn.send(("progress", phase, counters))
+    
+    try:
+        conn.send(("result", target(progress, *args, **kwargs)))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+class Job:
+    """A unit of background work and its progress"""
+    
+    def __init__(self, kind: str):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.phase = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        # Set once the job's effects start becoming visible; from then on it runs to the end
+        self._committed = False
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+    
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+    
+    def check_cancelled(self):
+        """Stop the job here if cancellation was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+    
+    def update(self, phase: Optional[str] = None, **progress):
+        """Record the current phase and progress counters"""
+        with self._lock:
+            if phase is not None:
+                self.phase = phase
+            self.progress.update(progress)
+    
+    def checkpoint(self, phase: Optional[str] = None, **progress):
+        """Record progress, then stop the job here if cancellation was requested"""
+        self.update(phase, **progress)
+        self.check_cancelled()
+    
+    def commit(self):
+        """Pass the point of no return: stop now if cancellation was requested, refuse it afterwards"""
+        with self._lock:
+            if self._cancel.is_set():
+                raise JobCancelled()
+            self._committed = True
+    
+    def start(self) -> bool:
+        """Mark the job running unless it was cancelled while queued"""
+        with self._lock:
+            if self.finished:
+                return False
+            self.status = "running"
+            self.started_at = time.time()
+            return True
+    
+    def finish(self, status: str, result=None, error: Optional[str] = None):
+        with self._lock:
+            self.status = status
+            self.phase = "done" if status == "completed" else status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+    
+    def cancel(self) -> bool:
+        """Request cancellation; queued jobs are cancelled immediately"""
+        with self._lock:
+            if self.finished or self._committed:
+                return False
+            self._cancel.set()
+            if self.status == "pending":
+                self.status = "cancelled"
+                self.phase = "cancelled"
+                self.finished_at = time.time()
+            return True
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "phase": self.phase,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+class JobService:
+    """Service for running background jobs on worker threads and processes"""
+    
+    _instance = None
+    _jobs = None
+    _executor = None
+    _process_executor = None
+    _lock = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(JobService, cls).__new__(cls)
+            cls._instance._jobs = OrderedDict()
+            cls._instance._executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            # Each of these threads supervises one worker process at a time
+            cls._instance._process_executor = ThreadPoolExecutor(max_workers=PROCESS_WORKERS, thread_name_prefix="job-process")
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+    
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs) on the worker threads"""
+        return self._enqueue(self._executor, kind, fn, args, kwargs)
+    
+    def submit_process(self, kind: str, target: Callable[..., Any], *args,
+                       on_result: Optional[Callable[[Job, Any], Any]] = None, **kwargs) -> Job:
+        """Queue picklable target(progress, *args, **kwargs) in a worker process"""
+        # on_result(job, value) runs back in this process and supplies the job result
+        return self._enqueue(self._process_executor, kind, self._supervise, (target, args, kwargs, on_result), {})
+    
+    def _enqueue(self, executor: ThreadPoolExecutor, kind: str, fn: Callable[..., Any], args, kwargs) -> Job:
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        executor.submit(self._run, job, fn, args, kwargs)
+        return job
+    
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        if not job.start():
+            return
+        try:
+            result = fn(job, *args, **kwargs)
+            # Work that never committed explicitly commits on return
+            job.commit()
+            job.finish("completed", result=result)
+        except JobCancelled:
+            job.finish("cancelled")
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.job_id, job.kind)
+            job.finish("failed", error=str(e))
+    
+    def _supervise(self, job: Job, target: Callable[..., Any], args, kwargs,
+                   on_result: Optional[Callable[[Job, Any], Any]]):
+        """Run target in a fresh process, relaying progress and honouring cancellation"""
+        # Spawned workers do not inherit this process's threads or locks
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        # Not a daemon: joblib/loky falls back to one core inside daemonic processes
+        process = context.Process(target=_process_main, args=(sender, target, args, kwargs))
+        process.start()
+        sender.close()
+        
+        try:
+            value = self._await_process(job, process, receiver)
+        finally:
+            receiver.close()
+            process.join(TERMINATE_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        
+        # on_result makes the outcome visible, so it always runs to the end once started
+        job.commit()
+        return on_result(job, value) if on_result is not None else value
+    
+    def _await_process(self, job: Job, process, receiver):
+        while True:
+            if job.cancel_requested:
+                process.terminate()
+                raise JobCancelled()
+            if not receiver.poll(POLL_INTERVAL):
+                continue
+            try:
+                message = receiver.recv()
+            except EOFError:
+                process.join(TERMINATE_TIMEOUT)
+                raise RuntimeError(f"Worker process exited unexpectedly (exit code {process.exitcode})")
+            if message[0] == "progress":
+                job.update(message[1], **message[2])
+            elif message[0] == "result":
+                return message[1]
+            else:
+                raise RuntimeError(message[1])
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[job_id]
+    
+    def get(self, job_id: str) -> Job:
+        """Look up a job by id"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Job not found: {job_id}")
+        return job
+    
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a queued or running job that has not reached its commit point"""
+        job = self.get(job_id)
+        if not job.cancel() and job.status != "cancelled":
+            raise JobNotCancellable(f"Job {job_id} is {job.status} in phase '{job.phase}' and can no longer be cancelled")
+        return job
+    
+    def shutdown(self):
+        """Cancel outstanding jobs and stop their worker processes"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._process_executor.shutdown(wait=True, cancel_futures=True)
+    
+    def list_jobs(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in reversed(jobs) if kind is None or job.kind == kind]
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable
+import json
+import joblib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+REGISTRY_DIR = "models/registry"
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "4"))  # Versions kept loaded in memory
+ARTIFACT_FILE = "model.joblib"
+META_FILE = "meta.json"
+ACTIVE_FILE = "active.json"
+
+class ModelRegistry:
+    """Versioned on-disk store of trained models with an LRU of loaded versions"""
+    
+    def __init__(self, registry_dir: str = REGISTRY_DIR, cache_size: int = MODEL_CACHE_SIZE):
+        self.registry_dir = registry_dir
+        self.cache_size = cache_size
+        self._loaded = OrderedDict()
+        self._lock = threading.RLock()
+        # (file identity, version) of the last active pointer read
+        self._active = None
+    
+    def _version_dir(self, version: int) -> str:
+        return os.path.join(self.registry_dir, str(int(version)))
+    
+    def artifact_path(self, version: int) -> str:
+        """Path of a version's model artifact"""
+        path = os.path.join(self._version_dir(version), ARTIFACT_FILE)
+        if not os.path.exists(path):
+            raise ValueError(f"Model version not found: {version}")
+        return path
+    
+    def versions(self) -> List[int]:
+        """All registered versions, oldest first"""
+        if not os.path.isdir(self.registry_dir):
+            return []
+        return sorted(
+            int(name) for name in os.listdir(self.registry_dir)
+            if name.isdigit() and os.path.exists(os.path.join(self.registry_dir, name, META_FILE))
+        )
+    
+    def _claim_version(self) -> int:
+        """Reserve the next free version number by creating its directory"""
+        while True:
+            claimed = [int(name) for name in os.listdir(self.registry_dir) if name.isdigit()]
+            version = max(claimed) + 1 if claimed else 1
+            try:
+                # mkdir is atomic, so two processes can never claim the same number
+                os.mkdir(self._version_dir(version))
+                return version
+            except FileExistsError:
+                continue
+    
+    def register(self, model_data: Dict[str, Any], meta: Dict[str, Any], loaded: Any = None) -> int:
+        """Store a model artifact and its metadata under the next version number"""
+        os.makedirs(self.registry_dir, exist_ok=True)
+        # Write into a scratch directory of this call's own, then move the files into place
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.registry_dir)
+        try:
+            # Uncompressed so numpy arrays in the artifact can be memory-mapped on load
+            joblib.dump(model_data, os.path.join(tmp_dir, ARTIFACT_FILE))
+            version = self._claim_version()
+            meta = {**meta, "version": version, "created_at": time.time()}
+            with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+                json.dump(meta, f)
+            version_dir = self._version_dir(version)
+            os.replace(os.path.join(tmp_dir, ARTIFACT_FILE), os.path.join(version_dir, ARTIFACT_FILE))
+            # versions() lists a version once its metadata exists, so that goes last
+            os.replace(os.path.join(tmp_dir, META_FILE), os.path.join(version_dir, META_FILE))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if loaded is not None:
+            self._remember(version, loaded)
+        return version
+    
+    def get_meta(self, version: int) -> Dict[str, Any]:
+        """Get the stored metadata of a version"""
+        path = os.path.join(self._version_dir(version), META_FILE)
+        if not os.path.exists(path):
+            raise ValueError(f"Model version not found: {version}")
+        with open(path) as f:
+            return json.load(f)
+    
+    def list_models(self) -> List[Dict[str, Any]]:
+        """Metadata of every version, newest first"""
+        return [self.get_meta(version) for version in reversed(self.versions())]
+    
+    def load(self, version: int, decode: Callable[[Dict[str, Any]], Any] = lambda model_data: model_data) -> Any:
+        """Load a version's artifact through the LRU, memory-mapping its arrays"""
+        with self._lock:
+            if version in self._loaded:
+                self._loaded.move_to_end(version)
+                return self._loaded[version]
+        
+        # Load outside the lock; mapped pages are shared with other processes reading the file
+        loaded = decode(joblib.load(self.artifact_path(version), mmap_mode="r"))
+        self._remember(version, loaded)
+        return loaded
+    
+    def _remember(self, version: int, loaded: Any):
+        with self._lock:
+            self._loaded[version] = loaded
+            self._loaded.move_to_end(version)
+            while len(self._loaded) > self.cache_size:
+                self._loaded.popitem(last=False)
+    
+    def loaded_versions(self) -> List[int]:
+        """Versions currently held in memory, least recently used first"""
+        with self._lock:
+            return list(self._loaded)
+    
+    def get_active(self) -> Optional[int]:
+        """The version marked as serving, if any, as last written by any process"""
+        path = os.path.join(self.registry_dir, ACTIVE_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # set_active replaces the file, so an unchanged identity means an unchanged pointer
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        active = self._active
+        if active is not None and active[0] == identity:
+            return active[1]
+        with open(path) as f:
+            version = json.load(f).get("version")
+        self._active = (identity, version)
+        return version
+    
+    def set_active(self, version: int):
+        """Mark a version as the one to serve"""
+        os.makedirs(self.registry_dir, exist_ok=True)
+        path = os.path.join(self.registry_dir, ACTIVE_FILE)
+        # A temp file of this call's own, so concurrent activations never write into the same one
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.registry_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": version, "activated_at": time.time()}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
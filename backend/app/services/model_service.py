@@ -1,170 +1,671 @@
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, RepeatedKFold
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
-import joblib
-import time
-from typing import Dict, Any, Tuple, Optional
+from sklearn.base import clone
+from joblib import Parallel, delayed, effective_n_jobs
+import copy
+import math
 import os
+import threading
+import time
+from typing import Dict, Any, Tuple, Optional, Callable, List, Iterable, Iterator
+from app.services.model_registry import ModelRegistry
+from app.services.prediction_cache import PredictionCache
+from app.services.tree_engine import compile_model
+
+MIN_INCREMENT_EVAL_ROWS = 10  # Smallest increment that gets its own held-out evaluation
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))  # Throwaway prediction rounds before reporting ready
+WARMUP_BATCH_SIZE = 64
+# Largest batch sent to the compiled tree evaluator; bigger ones use the library's native predict
+COMPILED_MAX_ROWS = int(os.getenv("COMPILED_MAX_ROWS", "256"))
+
+COMPARE_JOBS = int(os.getenv("COMPARE_JOBS", "-1"))  # Cores shared by models trained side by side; -1 uses every core
+MODEL_ALGORITHMS = ("linear", "random_forest", "xgboost")
+CV_JOBS = int(os.getenv("CV_JOBS", "-1"))  # Folds fitted in parallel; -1 uses every core
+
+MODEL_DEFAULTS = {
+    "random_forest": {
+        "n_estimators": 100,
+        "max_depth": 10,
+        "random_state": 42,
+        "n_jobs": -1
+    },
+    "xgboost": {
+        "n_estimators": 100,
+        "max_depth": 6,
+        "learning_rate": 0.1,
+        "random_state": 42,
+        "n_jobs": -1
+    }
+}
+
+def build_model(algorithm: str, **params):
+    """Create an unfitted estimator for an algorithm id, overriding its default parameters"""
+    if algorithm == "linear":
+        return LinearRegression(**params)
+    elif algorithm == "random_forest":
+        return RandomForestRegressor(**{**MODEL_DEFAULTS[algorithm], **params})
+    elif algorithm == "xgboost":
+        return XGBRegressor(**{**MODEL_DEFAULTS[algorithm], **params})
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+def regression_metrics(y_true, y_pred) -> Dict[str, float]:
+    """Compute the regression metrics reported for a model"""
+    mse = float(mean_squared_error(y_true, y_pred))
+    return {
+        "r2_score": float(r2_score(y_true, y_pred)),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "rmse": float(np.sqrt(mse)),
+        "mse": mse
+    }
+
+def feature_importance(model, feature_names: List[str]) -> Optional[Dict[str, float]]:
+    """Get per-feature importance, or absolute coefficients for linear models"""
+    if hasattr(model, 'feature_importances_'):
+        return {name: float(importance) for name, importance in zip(feature_names, model.feature_importances_)}
+    elif hasattr(model, 'coef_'):
+        return {name: float(abs(coef)) for name, coef in zip(feature_names, model.coef_)}
+    return None
+
+def linear_statistics(X: pd.DataFrame, y: pd.Series) -> Dict[str, np.ndarray]:
+    """Sufficient statistics (XᵀX, Xᵀy with an intercept column) for least squares"""
+    A = np.column_stack([np.ones(len(X)), X.to_numpy(dtype=np.float64)])
+    return {"gram": A.T @ A, "moment": A.T @ y.to_numpy(dtype=np.float64)}
+
+def merge_statistics(current: Dict[str, np.ndarray], delta: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Combine the least-squares statistics of two disjoint row sets"""
+    return {key: current[key] + delta[key] for key in ("gram", "moment")}
+
+def linear_from_statistics(statistics: Dict[str, np.ndarray], feature_names: List[str]) -> LinearRegression:
+    """Solve the normal equations into a fitted LinearRegression"""
+    coef = np.linalg.lstsq(statistics["gram"], statistics["moment"], rcond=None)[0]
+    model = LinearRegression()
+    model.intercept_ = float(coef[0])
+    model.coef_ = coef[1:]
+    model.n_features_in_ = len(feature_names)
+    model.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return model
+
+class TrainedModel:
+    """A fitted model together with the metadata needed to serve and extend it"""
+    
+    def __init__(self, model, model_type: str, feature_names: List[str], metrics: Optional[Dict[str, float]],
+                 statistics: Optional[Dict[str, np.ndarray]] = None, lineage: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.model_type = model_type
+        self.feature_names = feature_names
+        self.metrics = metrics
+        # Least-squares statistics of the training rows (linear models only)
+        self.statistics = statistics
+        # Dataset snapshot the model was trained on: dataset_id, generation, rows
+        self.lineage = lineage
+        # Registry version, assigned when the model is published
+        self.version = None
+        # Serving state, built when the model is served: linear weights or the flattened tree ensemble
+        self.coef = None
+        self.intercept = None
+        self.engine = None
+    
+    def compile(self) -> "TrainedModel":
+        """Precompute what the pandas-free prediction path needs"""
+        if self.model_type == "linear":
+            self.coef = np.asarray(self.model.coef_, dtype=np.float64).ravel()
+            self.intercept = float(self.model.intercept_)
+        else:
+            self.engine = compile_model(self.model, self.model_type)
+        return self
+    
+    def to_matrix(self, rows) -> np.ndarray:
+        """Build a float matrix in feature order from feature dicts, ordered value sequences or an array"""
+        n_features = len(self.feature_names)
+        if isinstance(rows, np.ndarray):
+            X = np.atleast_2d(rows).astype(np.float64, copy=False)
+            if X.ndim != 2 or X.shape[1] != n_features:
+                raise ValueError(f"Expected {n_features} features per row: {', '.join(self.feature_names)}")
+        else:
+            X = self._rows_to_matrix(rows)
+        
+        if not np.isfinite(X).all():
+            raise ValueError("Feature values must be finite numbers")
+        return X
+    
+    def columns_to_matrix(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Stack one array per feature into a matrix in feature order"""
+        missing = [name for name in self.feature_names if name not in columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        arrays = [np.asarray(columns[name], dtype=np.float64) for name in self.feature_names]
+        if any(array.ndim != 1 or len(array) != len(arrays[0]) for array in arrays):
+            raise ValueError("Feature columns must be flat arrays of the same length")
+        return self.to_matrix(np.column_stack(arrays))
+    
+    def reorder_matrix(self, rows, feature_names: Optional[List[str]] = None) -> np.ndarray:
+        """Validate a row-major matrix, moving its columns (named by feature_names) into feature order"""
+        X = np.asarray(rows, dtype=np.float64)
+        if feature_names is not None:
+            missing = [name for name in self.feature_names if name not in feature_names]
+            if missing:
+                raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+            if X.ndim != 2 or X.shape[1] != len(feature_names):
+                raise ValueError("Each row needs one value per entry of feature_names")
+            X = X[:, [feature_names.index(name) for name in self.feature_names]]
+        return self.to_matrix(X)
+    
+    def _rows_to_matrix(self, rows) -> np.ndarray:
+        n_features = len(self.feature_names)
+        X = np.empty((len(rows), n_features), dtype=np.float64)
+        for i, row in enumerate(rows):
+            try:
+                if isinstance(row, dict):
+                    X[i] = [row[name] for name in self.feature_names]
+                elif len(row) == n_features:
+                    X[i] = row
+                else:
+                    raise ValueError(f"Expected {n_features} features per row: {', '.join(self.feature_names)}")
+            except KeyError as e:
+                raise ValueError(f"Missing feature: {e.args[0]}")
+            except TypeError:
+                raise ValueError(f"Feature values must be numbers (row {i})")
+        return X
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict a float matrix whose columns follow feature_names"""
+        if self.coef is not None:
+            return X @ self.coef + self.intercept
+        if self.engine is not None and len(X) <= COMPILED_MAX_ROWS:
+            return self.engine.predict(X)
+        return self.model.predict(pd.DataFrame(X, columns=self.feature_names))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "model_type": self.model_type,
+            "feature_names": self.feature_names,
+            "metrics": self.metrics,
+            "statistics": self.statistics,
+            "lineage": self.lineage
+        }
+    
+    @classmethod
+    def from_dict(cls, model_data: Dict[str, Any]) -> "TrainedModel":
+        return cls(
+            model_data["model"],
+            model_data["model_type"],
+            model_data["feature_names"],
+            model_data.get("metrics"),
+            model_data.get("statistics"),
+            model_data.get("lineage")
+        )
+
+def fit_model(X: pd.DataFrame, y: pd.Series, algorithm: str, test_size: float = 0.2,
+              progress: Optional[Callable[..., None]] = None) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Fit and evaluate a model without touching the live one"""
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=42
+    )
+    return fit_split(X_train, X_test, y_train, y_test, algorithm, progress=progress)
+
+def fit_split(X_train: pd.DataFrame, X_test: pd.DataFrame, y_train: pd.Series, y_test: pd.Series, algorithm: str,
+              n_jobs: Optional[int] = None, progress: Optional[Callable[..., None]] = None) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Fit and evaluate a model on a given train/test split, optionally capped at n_jobs cores"""
+    feature_names = X_train.columns.tolist()
+    allotment = {"n_jobs": n_jobs} if n_jobs is not None and algorithm != "linear" else {}
+    model = build_model(algorithm, **allotment)
+    
+    if progress is not None:
+        progress("fitting", train_rows=len(X_train), test_rows=len(X_test))
+    start_time = time.time()
+    model.fit(X_train, y_train)
+    statistics = linear_statistics(X_train, y_train) if algorithm == "linear" else None
+    training_time = time.time() - start_time
+    
+    if progress is not None:
+        progress("evaluating")
+    metrics = regression_metrics(y_test, model.predict(X_test))
+    if allotment:
+        # Serve with the usual threading rather than the training allotment
+        model.set_params(n_jobs=MODEL_DEFAULTS[algorithm]["n_jobs"])
+    
+    return TrainedModel(model, algorithm, feature_names, metrics, statistics), {
+        "message": "Model trained successfully",
+        "algorithm": algorithm,
+        "metrics": metrics,
+        "training_time": training_time,
+        "feature_importance": feature_importance(model, feature_names)
+    }
+
+def cpu_allotments(algorithms: List[str], n_cores: int) -> Dict[str, int]:
+    """Split cores between concurrent fits: one for each linear model, the rest shared by the tree models"""
+    tree_models = [algorithm for algorithm in algorithms if algorithm != "linear"]
+    share = max(1, (n_cores - (len(algorithms) - len(tree_models))) // max(len(tree_models), 1))
+    return {algorithm: 1 if algorithm == "linear" else share for algorithm in algorithms}
+
+def compare_models(X: pd.DataFrame, y: pd.Series, algorithms: List[str], test_size: float = 0.2,
+                   progress: Optional[Callable[..., None]] = None) -> Tuple[Dict[str, TrainedModel], Dict[str, Any]]:
+    """Train several algorithms concurrently on one shared split and rank them on its test rows"""
+    unknown = [algorithm for algorithm in algorithms if algorithm not in MODEL_ALGORITHMS]
+    if unknown:
+        raise ValueError(f"Unknown algorithm: {', '.join(unknown)}")
+    if len(set(algorithms)) != len(algorithms):
+        raise ValueError("Algorithms must not repeat")
+    
+    start_time = time.time()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    n_cores = effective_n_jobs(COMPARE_JOBS)
+    allotments = cpu_allotments(algorithms, n_cores)
+    
+    trained_models = {}
+    leaderboard = []
+    with Parallel(n_jobs=min(len(algorithms), n_cores), return_as="generator") as parallel:
+        fits = parallel(
+            delayed(fit_split)(X_train, X_test, y_train, y_test, algorithm, n_jobs=allotments[algorithm])
+            for algorithm in algorithms
+        )
+        for algorithm, (trained, result) in zip(algorithms, fits):
+            trained_models[algorithm] = trained
+            leaderboard.append({
+                "algorithm": algorithm,
+                "metrics": result["metrics"],
+                "training_time": result["training_time"],
+                "n_jobs": allotments[algorithm]
+            })
+            if progress is not None:
+                progress("training", completed=len(leaderboard), total=len(algorithms), elapsed=time.time() - start_time)
+    
+    leaderboard.sort(key=lambda entry: entry["metrics"]["r2_score"], reverse=True)
+    for rank, entry in enumerate(leaderboard, start=1):
+        entry["rank"] = rank
+    
+    return trained_models, {
+        "message": "Models compared successfully",
+        "best_algorithm": leaderboard[0]["algorithm"],
+        "leaderboard": leaderboard,
+        "training_time": time.time() - start_time,
+        "total_fit_time": sum(entry["training_time"] for entry in leaderboard),
+        "train_rows": len(X_train),
+        "test_rows": len(X_test)
+    }
+
+def fold_assignments(n_rows: int, n_splits: int, n_repeats: int = 1) -> np.ndarray:
+    """Test fold of every row for each repeat of shuffled k-fold, shape (n_repeats, n_rows)"""
+    folds = np.empty((n_repeats, n_rows), dtype=np.int16)
+    splitter = RepeatedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=42)
+    for i, (_, test) in enumerate(splitter.split(np.empty((n_rows, 1)))):
+        folds[i // n_splits, test] = i % n_splits
+    return folds
+
+def _fit_fold(X: pd.DataFrame, y: pd.Series, algorithm: str, train: np.ndarray, test: np.ndarray) -> Tuple[Dict[str, float], float]:
+    """Fit one fold on a single core and score it on the held-out rows"""
+    model = build_model(algorithm) if algorithm == "linear" else build_model(algorithm, n_jobs=1)
+    start_time = time.time()
+    model.fit(X.iloc[train], y.iloc[train])
+    fit_time = time.time() - start_time
+    return regression_metrics(y.iloc[test], model.predict(X.iloc[test])), fit_time
+
+def cross_validate(X: pd.DataFrame, y: pd.Series, algorithm: str, folds: np.ndarray) -> Dict[str, Any]:
+    """Fit every fold of (repeated) k-fold in parallel and summarise the spread of each metric"""
+    if algorithm not in MODEL_ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if folds.shape[1] != len(X):
+        raise ValueError("Dataset changed while preparing folds; retry")
+    
+    n_repeats, n_splits = folds.shape[0], int(folds.max()) + 1
+    splits = [
+        (np.flatnonzero(folds[repeat] != fold), np.flatnonzero(folds[repeat] == fold))
+        for repeat in range(n_repeats) for fold in range(n_splits)
+    ]
+    start_time = time.time()
+    results = Parallel(n_jobs=CV_JOBS)(
+        delayed(_fit_fold)(X, y, algorithm, train, test) for train, test in splits
+    )
+    
+    fold_results = [
+        {"repeat": i // n_splits, "fold": i % n_splits, "metrics": metrics, "fit_time": fit_time}
+        for i, (metrics, fit_time) in enumerate(results)
+    ]
+    summary = {}
+    for name in results[0][0]:
+        values = np.array([metrics[name] for metrics, _ in results])
+        summary[name] = {
+            "mean": float(values.mean()),
+            "std": float(values.std(ddof=1)),
+            "min": float(values.min()),
+            "max": float(values.max())
+        }
+    
+    return {
+        "algorithm": algorithm,
+        "n_splits": n_splits,
+        "n_repeats": n_repeats,
+        "metrics": summary,
+        "folds": fold_results,
+        "training_time": time.time() - start_time,
+        "total_fit_time": sum(fit_time for _, fit_time in results)
+    }
+
+def compare_worker(progress: Callable[..., None], X: pd.DataFrame, y: pd.Series, algorithms: List[str],
+                   test_size: float = 0.2) -> Tuple[Dict[str, TrainedModel], Dict[str, Any]]:
+    """Entry point for comparing algorithms in a worker process"""
+    return compare_models(X, y, algorithms, test_size, progress=progress)
+
+def train_worker(progress: Callable[..., None], X: pd.DataFrame, y: pd.Series, algorithm: str,
+                 test_size: float = 0.2) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Entry point for training in a worker process"""
+    return fit_model(X, y, algorithm, test_size, progress=progress)
+
+def incremental_fit(trained: TrainedModel, X: pd.DataFrame, y: pd.Series,
+                    test_size: float = 0.2) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Extend a trained model with new rows, at a cost proportional to the new rows"""
+    if len(X) == 0:
+        raise ValueError("No new rows since the model was trained")
+    
+    # Too few new rows to hold some out; keep the previous metrics instead
+    evaluate = len(X) >= MIN_INCREMENT_EVAL_ROWS
+    if evaluate:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    else:
+        X_train, y_train = X, y
+    
+    # New trees/rounds in proportion to the new rows' share of the data
+    share = len(X) / max(trained.lineage["rows"], 1)
+    statistics = None
+    start_time = time.time()
+    
+    if trained.model_type == "linear":
+        if trained.statistics is None:
+            raise ValueError("Model has no stored least-squares statistics; run a full train first")
+        statistics = merge_statistics(trained.statistics, linear_statistics(X_train, y_train))
+        model = linear_from_statistics(statistics, trained.feature_names)
+    elif trained.model_type == "random_forest":
+        # Shallow copy so the live forest keeps its own tree list
+        model = copy.copy(trained.model)
+        model.estimators_ = list(trained.model.estimators_)
+        extra_trees = max(1, math.ceil(MODEL_DEFAULTS["random_forest"]["n_estimators"] * share))
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + extra_trees)
+        model.fit(X_train, y_train)
+        model.set_params(warm_start=False)
+    elif trained.model_type == "xgboost":
+        extra_rounds = max(1, math.ceil(MODEL_DEFAULTS["xgboost"]["n_estimators"] * share))
+        model = clone(trained.model).set_params(n_estimators=extra_rounds)
+        # Continue boosting from a copy of the live booster
+        model.fit(X_train, y_train, xgb_model=trained.model.get_booster().copy())
+        model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+    else:
+        raise ValueError(f"Unknown algorithm: {trained.model_type}")
+    
+    training_time = time.time() - start_time
+    metrics = regression_metrics(y_test, model.predict(X_test)) if evaluate else trained.metrics
+    
+    return TrainedModel(model, trained.model_type, trained.feature_names, metrics, statistics), {
+        "message": "Model updated incrementally",
+        "algorithm": trained.model_type,
+        "metrics": metrics,
+        "training_time": training_time,
+        "feature_importance": feature_importance(model, trained.feature_names),
+        "rows_added": len(X),
+        "evaluated_rows": len(X_test) if evaluate else 0
+    }
 
 class ModelService:
     """Service for handling ML model operations"""
     
     _instance = None
-    _model = None
-    _model_type = None
-    _feature_names = None
-    _metrics = None
+    _current = None
+    _lock = None
+    _registry = None
+    _readiness = None
+    _cache = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ModelService, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._registry = ModelRegistry()
+            cls._instance._readiness = {"ready": False, "status": "starting"}
+            cls._instance._cache = PredictionCache()
         return cls._instance
     
-    def train_model(self, X: pd.DataFrame, y: pd.Series, algorithm: str, test_size: float = 0.2) -> Dict[str, Any]:
-        """Train a machine learning model"""
-        
-        # Store feature names
-        self._feature_names = X.columns.tolist()
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42
-        )
+    def _live(self) -> Optional[TrainedModel]:
+        """The live model, following the registry's active pointer when another worker process moved it"""
+        # Read the reference once so a concurrent publish cannot mix two models
+        current = self._current
+        version = self._registry.get_active()
+        if version is None or (current is not None and current.version == version):
+            return current
         
-        # Select and train model
-        start_time = time.time()
-        
-        if algorithm == "linear":
-            model = LinearRegression()
-        elif algorithm == "random_forest":
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
-        elif algorithm == "xgboost":
-            model = XGBRegressor(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42,
-                n_jobs=-1
-            )
-        else:
-            raise ValueError(f"Unknown algorithm: {algorithm}")
-        
-        # Train the model
-        model.fit(X_train, y_train)
-        
-        training_time = time.time() - start_time
-        
-        # Make predictions
-        y_pred = model.predict(X_test)
-        
-        # Calculate metrics
-        metrics = {
-            "r2_score": float(r2_score(y_test, y_pred)),
-            "mae": float(mean_absolute_error(y_test, y_pred)),
-            "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
-            "mse": float(mean_squared_error(y_test, y_pred))
-        }
-        
-        # Get feature importance if available
-        feature_importance = None
-        if hasattr(model, 'feature_importances_'):
-            importance_dict = {}
-            for idx, importance in enumerate(model.feature_importances_):
-                importance_dict[self._feature_names[idx]] = float(importance)
-            feature_importance = importance_dict
-        elif hasattr(model, 'coef_'):
-            importance_dict = {}
-            for idx, coef in enumerate(model.coef_):
-                importance_dict[self._feature_names[idx]] = float(abs(coef))
-            feature_importance = importance_dict
+        trained = self.get_model(version)
+        with self._lock:
+            # Only while the pointer still names it; a publish here may have moved it on
+            if self._registry.get_active() == version and (self._current is None or self._current.version != version):
+                self._current = trained
+                self._cache.clear()
+            return self._current
+    
+    def _require_model(self) -> TrainedModel:
+        current = self._live()
+        if current is None:
+            raise ValueError("No model trained")
+        return current
+    
+    def get_model(self, version: Optional[int] = None) -> TrainedModel:
+        """Get the live model, or a registered version loaded on demand"""
+        if version is None:
+            return self._require_model()
         
-        # Store model and metrics
-        self._model = model
-        self._model_type = algorithm
-        self._metrics = metrics
+        def decode(model_data: Dict[str, Any]) -> TrainedModel:
+            trained = TrainedModel.from_dict(model_data).compile()
+            trained.version = version
+            return trained
         
+        return self._registry.load(version, decode)
+    
+    def _version_meta(self, trained: TrainedModel, meta: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            "message": "Model trained successfully",
-            "algorithm": algorithm,
-            "metrics": metrics,
-            "training_time": training_time,
-            "feature_importance": feature_importance
+            "model_type": trained.model_type,
+            "feature_names": trained.feature_names,
+            "metrics": trained.metrics,
+            "dataset_id": trained.lineage["dataset_id"] if trained.lineage else None,
+            "lineage": trained.lineage,
+            **meta
         }
     
-    def predict(self, features: Dict[str, float]) -> float:
-        """Make a single prediction"""
-        if self._model is None:
-            raise ValueError("No model trained")
+    def register(self, trained: TrainedModel, **meta) -> int:
+        """Store a model as a new version without serving it"""
+        trained.version = self._registry.register(trained.to_dict(), self._version_meta(trained, meta))
+        return trained.version
+    
+    def publish(self, trained: TrainedModel, expected: Optional[TrainedModel] = None, **meta) -> int:
+        """Register a model as a new version and atomically make it the live one"""
+        meta = self._version_meta(trained, meta)
+        trained.compile()
+        with self._lock:
+            # With expected set, only replace the model the caller started from
+            if expected is not None and self._current is not expected:
+                raise ValueError("Model was replaced during the update; retry")
+            trained.version = self._registry.register(trained.to_dict(), meta, loaded=trained)
+            self._current = trained
+            self._registry.set_active(trained.version)
+            self._cache.clear()
+        return trained.version
+    
+    def train_model(self, X: pd.DataFrame, y: pd.Series, algorithm: str, test_size: float = 0.2,
+                    lineage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Train a machine learning model"""
+        trained, result = fit_model(X, y, algorithm, test_size)
+        trained.lineage = lineage
+        version = self.publish(trained, training_time=result["training_time"], source="train")
+        return {**result, "version": version}
+    
+    def update_model(self, rows_since: Callable[[Dict[str, Any], List[str]], Tuple[pd.DataFrame, pd.Series, Dict[str, Any]]],
+                     test_size: float = 0.2) -> Dict[str, Any]:
+        """Extend the live model with rows appended since it was trained"""
+        # rows_since(lineage, feature_names) returns the new rows and the lineage that includes them
+        trained = self._require_model()
+        if trained.lineage is None:
+            raise ValueError("Model has no training lineage; run a full train first")
+        X, y, lineage = rows_since(trained.lineage, trained.feature_names)
         
-        # Create DataFrame with correct feature order
-        X = pd.DataFrame([features])[self._feature_names]
-        prediction = self._model.predict(X)
+        updated, result = incremental_fit(trained, X, y, test_size)
+        updated.lineage = lineage
+        version = self.publish(
+            updated, expected=trained, training_time=result["training_time"],
+            source="retrain", parent_version=trained.version
+        )
+        return {**result, "version": version, "total_rows": lineage["rows"]}
+    
+    def _predict_cached(self, current: TrainedModel, X: np.ndarray) -> List[float]:
+        """Predict rows, sending only those without a cached prediction to the model"""
+        predictions = self._cache.lookup(current.version, X)
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            computed = current.predict(X[missing]) if len(missing) < len(X) else current.predict(X)
+            self._cache.store(current.version, X[missing], computed)
+            for i, prediction in zip(missing, computed.tolist()):
+                predictions[i] = prediction
+        return predictions
+    
+    def predict(self, features, version: Optional[int] = None) -> float:
+        """Make a single prediction from a feature dict or values in feature order"""
+        current = self.get_model(version)
+        prediction = self._predict_cached(current, current.to_matrix([features]))
         
         return float(prediction[0])
     
-    def predict_batch(self, features_list: list) -> list:
-        """Make batch predictions"""
-        if self._model is None:
-            raise ValueError("No model trained")
-        
-        # Create DataFrame with correct feature order
-        X = pd.DataFrame(features_list)[self._feature_names]
-        predictions = self._model.predict(X)
-        
-        return [float(pred) for pred in predictions]
+    def predict_batch(self, features_list, version: Optional[int] = None) -> list:
+        """Make batch predictions from feature dicts, value sequences or a 2-D array"""
+        current = self.get_model(version)
+        return self._predict_cached(current, current.to_matrix(features_list))
     
-    def save_model(self, filepath: str = "models/salary_model.pkl"):
-        """Save the trained model"""
-        if self._model is None:
-            raise ValueError("No model trained")
-        
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        model_data = {
-            "model": self._model,
-            "model_type": self._model_type,
-            "feature_names": self._feature_names,
-            "metrics": self._metrics
-        }
+    def predict_columnar(self, columns: Optional[Dict[str, Any]] = None, rows=None,
+                         feature_names: Optional[List[str]] = None,
+                         version: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Predict a batch given as arrays per feature or as a row-major matrix, in one vectorised step"""
+        if (columns is None) == (rows is None):
+            raise ValueError("Provide either columns or rows")
+        current = self.get_model(version)
+        X = current.columns_to_matrix(columns) if columns is not None else current.reorder_matrix(rows, feature_names)
         
-        joblib.dump(model_data, filepath)
-        return filepath
+        # Columnar batches are large and rarely repeat whole, so they skip the prediction cache
+        return current.predict(X), current.version
+    
+    def predict_chunks(self, chunks: Iterable[pd.DataFrame],
+                       version: Optional[int] = None) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        """Score DataFrame chunks with one model version; rows with missing features get NaN"""
+        # Pinned up front so a model swap mid-stream cannot mix versions in one file
+        current = self.get_model(version)
+        for chunk in chunks:
+            missing = [name for name in current.feature_names if name not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+            X = chunk[current.feature_names].to_numpy(dtype=np.float64)
+            valid = np.isfinite(X).all(axis=1)
+            predictions = np.full(len(X), np.nan)
+            if valid.any():
+                # Bulk rows bypass the prediction cache so one file cannot flush it
+                predictions[valid] = current.predict(X[valid])
+            yield chunk, predictions
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the prediction cache"""
+        return self._cache.get_stats()
     
-    def load_model(self, filepath: str = "models/salary_model.pkl"):
-        """Load a trained model"""
-        if not os.path.exists(filepath):
-            raise ValueError(f"Model file not found: {filepath}")
+    def get_artifact_path(self, version: Optional[int] = None) -> str:
+        """Path of a registered model artifact (the live version by default)"""
+        if version is None:
+            version = self._require_model().version
+        return self._registry.artifact_path(version)
+    
+    def load_model(self, version: Optional[int] = None) -> TrainedModel:
+        """Serve a registered version (the last active one by default), e.g. to roll back"""
+        if version is None:
+            version = self._registry.get_active()
+            if version is None:
+                raise ValueError("No registered model to load")
         
-        model_data = joblib.load(filepath)
+        trained = self.get_model(version)
+        with self._lock:
+            self._current = trained
+            self._registry.set_active(version)
+            self._cache.clear()
+        return trained
+    
+    def warm_up(self, version: int, rounds: int = WARMUP_ROUNDS) -> Dict[str, Any]:
+        """Run throwaway predictions through the model to trigger lazy allocations and thread pools"""
+        trained = self.get_model(version)
+        row = {name: 1.0 for name in trained.feature_names}
+        # Straight to the model: through the prediction cache every round after the first would be a hit
+        single = trained.to_matrix([row])
+        batch = trained.to_matrix([row] * WARMUP_BATCH_SIZE)
+        latencies = []
+        for _ in range(rounds):
+            start_time = time.perf_counter()
+            trained.predict(single)
+            trained.predict(batch)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        return {"rounds": rounds, "first_round_ms": latencies[0], "last_round_ms": latencies[-1]} if latencies else {"rounds": 0}
+    
+    def preload(self, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """Load and warm up the active registered version, then report ready"""
+        progress = progress or (lambda phase=None, **counters: None)
+        version = self._registry.get_active()
+        if version is None:
+            self._readiness = {"ready": True, "status": "no_model"}
+            return self._readiness
         
-        self._model = model_data["model"]
-        self._model_type = model_data["model_type"]
-        self._feature_names = model_data["feature_names"]
-        self._metrics = model_data.get("metrics")
+        try:
+            self._readiness = {"ready": False, "status": "loading", "version": version}
+            progress("loading", version=version)
+            trained = self.get_model(version)
+            self._readiness = {"ready": False, "status": "warming", "version": version}
+            progress("warming", version=version)
+            warm_up = self.warm_up(version)
+        except Exception as e:
+            # Still ready: the API can upload and train even if the stored model is unusable
+            self._readiness = {"ready": True, "status": "failed", "version": version, "error": str(e)}
+            raise
         
-        return True
+        with self._lock:
+            # A model trained while preloading is newer; keep it
+            if self._current is None:
+                self._current = trained
+                self._cache.clear()
+        self._readiness = {"ready": True, "status": "ready", "version": version, "warm_up": warm_up}
+        return self._readiness
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Whether startup preloading has finished"""
+        return dict(self._readiness)
+    
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """Metadata of every registered version, newest first"""
+        current = self._live()
+        live = current.version if current is not None else None
+        loaded = set(self._registry.loaded_versions())
+        return [
+            {**meta, "active": meta["version"] == live, "loaded": meta["version"] in loaded}
+            for meta in self._registry.list_models()
+        ]
     
     def get_metrics(self) -> Optional[Dict[str, float]]:
         """Get current model metrics"""
-        return self._metrics
+        current = self._live()
+        return current.metrics if current is not None else None
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model"""
-        if self._model is None:
+        current = self._live()
+        if current is None:
             return {"status": "no_model"}
         
         return {
             "status": "trained",
-            "model_type": self._model_type,
-            "feature_names": self._feature_names,
-            "metrics": self._metrics
+            "version": current.version,
+            "model_type": current.model_type,
+            "feature_names": current.feature_names,
+            "metrics": current.metrics
         }
@@ -0,0 +1,191 @@
+import math
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBRegressor
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+from app.services.dataset_cache import DatasetCache
+from app.services.model_service import (
+    MODEL_DEFAULTS, TrainedModel, build_model, feature_importance,
+    linear_statistics, merge_statistics, linear_from_statistics
+)
+
+SPLIT_SEED = 42
+TEMP_DIR = "temp"  # XGBoost external-memory page cache
+
+class ChunkSource:
+    """Re-iterable record batches of a cached dataset with a fixed per-row train/test split"""
+    
+    def __init__(self, cache_dir: str, dataset_id: str, features: List[str], target: str, test_size: float):
+        self.cache = DatasetCache(cache_dir)
+        self.dataset_id = dataset_id
+        self.features = features
+        self.target = target
+        self.test_size = test_size
+        self.num_batches = self.cache.num_batches(dataset_id)
+    
+    def __iter__(self) -> Iterator[Tuple[int, pd.DataFrame, pd.Series, np.ndarray]]:
+        """Yield (batch index, features, target, test mask) per record batch"""
+        columns = self.features + [self.target]
+        for i, chunk in enumerate(self.cache.iter_batches(self.dataset_id, columns=columns)):
+            # Seeded by batch index so every pass sees the same split
+            test = np.random.default_rng([SPLIT_SEED, i]).random(len(chunk)) < self.test_size
+            yield i, chunk[self.features], chunk[self.target], test
+
+class StreamingMetrics:
+    """Regression metrics accumulated over batches"""
+    
+    def __init__(self):
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sse = 0.0
+        self.sae = 0.0
+    
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        errors = y_true - np.asarray(y_pred, dtype=np.float64)
+        self.n += len(y_true)
+        self.sum_y += float(y_true.sum())
+        self.sum_y2 += float(np.dot(y_true, y_true))
+        self.sse += float(np.dot(errors, errors))
+        self.sae += float(np.abs(errors).sum())
+    
+    def result(self) -> Dict[str, float]:
+        if self.n == 0:
+            raise ValueError("Test split is empty")
+        mse = self.sse / self.n
+        total = self.sum_y2 - self.sum_y ** 2 / self.n
+        return {
+            "r2_score": 1.0 - self.sse / total if total > 0 else 0.0,
+            "mae": self.sae / self.n,
+            "rmse": math.sqrt(mse),
+            "mse": mse
+        }
+
+def _fit_linear(source: ChunkSource, progress: Callable[..., None]):
+    """Exact least squares from normal equations accumulated one batch at a time"""
+    statistics = None
+    for i, X, y, test in source:
+        batch = linear_statistics(X[~test], y[~test])
+        statistics = batch if statistics is None else merge_statistics(statistics, batch)
+        progress("fitting", batches_done=i + 1, total_batches=source.num_batches)
+    
+    return linear_from_statistics(statistics, source.features), statistics
+
+def _fit_random_forest(source: ChunkSource, progress: Callable[..., None]):
+    """Grow a share of the forest on each batch and merge the trees into one model"""
+    n_estimators = MODEL_DEFAULTS["random_forest"]["n_estimators"]
+    forest = None
+    trees = []
+    for i, X, y, test in source:
+        share = max(1, n_estimators // source.num_batches + (i < n_estimators % source.num_batches))
+        part = build_model("random_forest", n_estimators=share, random_state=SPLIT_SEED + i)
+        part.fit(X[~test], y[~test])
+        trees.extend(part.estimators_)
+        if forest is None:
+            forest = part
+        progress("fitting", batches_done=i + 1, total_batches=source.num_batches, trees=len(trees))
+    
+    forest.estimators_ = trees
+    forest.n_estimators = len(trees)
+    return forest, None
+
+class _TrainIter(xgb.DataIter):
+    """Feeds the training rows of each batch to XGBoost's external-memory DMatrix"""
+    
+    def __init__(self, source: ChunkSource, cache_prefix: str):
+        self._source = source
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+    
+    def next(self, input_data: Callable) -> int:
+        if self._batches is None:
+            self._batches = iter(self._source)
+        try:
+            _, X, y, test = next(self._batches)
+        except StopIteration:
+            return 0
+        input_data(data=X[~test], label=y[~test])
+        return 1
+    
+    def reset(self):
+        self._batches = None
+
+class _RoundProgress(xgb.callback.TrainingCallback):
+    def __init__(self, progress: Callable[..., None], rounds: int):
+        self._progress = progress
+        self._rounds = rounds
+        super().__init__()
+    
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        self._progress("fitting", rounds_done=epoch + 1, total_rounds=self._rounds)
+        return False
+
+def _fit_xgboost(source: ChunkSource, progress: Callable[..., None]):
+    """Boost over an external-memory DMatrix paged from the record batches"""
+    defaults = MODEL_DEFAULTS["xgboost"]
+    params = {
+        "objective": "reg:squarederror",
+        "tree_method": "hist",
+        "max_depth": defaults["max_depth"],
+        "learning_rate": defaults["learning_rate"],
+        "seed": defaults["random_state"],
+        "nthread": defaults["n_jobs"]
+    }
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=TEMP_DIR) as cache_dir:
+        progress("paging", total_batches=source.num_batches)
+        dtrain = xgb.DMatrix(_TrainIter(source, os.path.join(cache_dir, "dtrain")))
+        booster = xgb.train(
+            params, dtrain, num_boost_round=defaults["n_estimators"],
+            callbacks=[_RoundProgress(progress, defaults["n_estimators"])]
+        )
+        del dtrain
+    
+    # Wrap the booster so serving sees the same estimator type as in-memory training
+    model = XGBRegressor(**defaults)
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    return model, None
+
+OUT_OF_CORE_TRAINERS = {
+    "linear": _fit_linear,
+    "random_forest": _fit_random_forest,
+    "xgboost": _fit_xgboost
+}
+
+def fit_out_of_core(cache_dir: str, dataset_id: str, features: List[str], target: str, algorithm: str,
+                    test_size: float = 0.2, progress: Optional[Callable[..., None]] = None) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Fit and evaluate a model by streaming a cached dataset instead of loading it"""
+    if algorithm not in OUT_OF_CORE_TRAINERS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    progress = progress or (lambda phase=None, **counters: None)
+    source = ChunkSource(cache_dir, dataset_id, features, target, test_size)
+    
+    start_time = time.time()
+    model, statistics = OUT_OF_CORE_TRAINERS[algorithm](source, progress)
+    training_time = time.time() - start_time
+    
+    # Second pass scores the held-out rows of every batch
+    metrics = StreamingMetrics()
+    for i, X, y, test in source:
+        if test.any():
+            metrics.update(y[test], model.predict(X[test]))
+        progress("evaluating", batches_done=i + 1, total_batches=source.num_batches)
+    
+    trained = TrainedModel(model, algorithm, features, metrics.result(), statistics)
+    return trained, {
+        "message": "Model trained successfully",
+        "algorithm": algorithm,
+        "metrics": trained.metrics,
+        "training_time": training_time,
+        "feature_importance": feature_importance(model, features)
+    }
+
+def out_of_core_worker(progress: Callable[..., None], cache_dir: str, dataset_id: str, features: List[str],
+                       target: str, algorithm: str, test_size: float = 0.2) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Entry point for out-of-core training in a worker process"""
+    return fit_out_of_core(cache_dir, dataset_id, features, target, algorithm, test_size, progress=progress)
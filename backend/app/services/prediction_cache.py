@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+import numpy as np
+import os
+import threading
+import time
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))  # Entries; 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))  # Seconds
+
+class PredictionCache:
+    """Bounded LRU of predictions keyed by model version and feature vector, with expiry"""
+    
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (version, row bytes) -> (prediction, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+    
+    def lookup(self, version: int, X: np.ndarray) -> List[Optional[float]]:
+        """Cached prediction for each row of X, or None where there is none"""
+        if not self.enabled:
+            return [None] * len(X)
+        
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for row in X:
+                key = (version, row.tobytes())
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[0])
+        return results
+    
+    def store(self, version: int, X: np.ndarray, predictions):
+        """Remember the predictions for the rows of X"""
+        if not self.enabled:
+            return
+        
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for row, prediction in zip(X, predictions):
+                key = (version, row.tobytes())
+                self._entries[key] = (float(prediction), expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every entry and restart the counters, e.g. when the live model changes"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+
+# Set bits in every byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+class WaveletMatrix:
+    """Bit-sliced permutation of ranks answering k-th smallest over any row range in O(log n)"""
+    
+    def __init__(self, ranks: np.ndarray):
+        self.n = len(ranks)
+        self.bits = max(int(self.n - 1).bit_length(), 1)
+        self.packed = []
+        self.zeros_before = []
+        self.zeros = []
+        values = ranks
+        for level in reversed(range(self.bits)):
+            bit = (values >> level) & 1
+            # One spare byte so rank queries at position n stay in range
+            packed = np.append(np.packbits(bit.astype(np.uint8), bitorder="little"), np.uint8(0))
+            self.packed.append(packed)
+            self.zeros_before.append(np.concatenate([[0], np.cumsum(8 - POPCOUNT[packed[:-1]])]).astype(np.int32))
+            self.zeros.append(int(self.n - bit.sum()))
+            # Stable partition: rows with a 0 bit first
+            values = np.concatenate([values[bit == 0], values[bit == 1]])
+    
+    def _rank0(self, level: int, i: np.ndarray) -> np.ndarray:
+        """Zero bits among the first i positions of a level"""
+        byte, offset = i >> 3, i & 7
+        ones = POPCOUNT[self.packed[level][byte] & ((1 << offset) - 1)]
+        return self.zeros_before[level][byte] + offset - ones
+    
+    def select(self, start: np.ndarray, stop: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """k-th smallest rank (0-based) among positions [start, stop) of each query"""
+        start, stop, k = start.astype(np.int64), stop.astype(np.int64), k.astype(np.int64)
+        result = np.zeros(len(k), dtype=np.int64)
+        for i, level in enumerate(reversed(range(self.bits))):
+            zeros_start, zeros_stop = self._rank0(i, start), self._rank0(i, stop)
+            in_zeros = zeros_stop - zeros_start
+            one = k >= in_zeros
+            result |= one.astype(np.int64) << level
+            k = np.where(one, k - in_zeros, k)
+            start = np.where(one, self.zeros[i] + start - zeros_start, zeros_start)
+            stop = np.where(one, self.zeros[i] + stop - zeros_stop, zeros_stop)
+        return result
+
+class SalaryIndex:
+    """Salaries sorted by experience with prefix sums and a rank index for O(log n) window queries"""
+    
+    def __init__(self, experience: pd.Series, salary: pd.Series):
+        present = experience.notna().to_numpy() & salary.notna().to_numpy()
+        exp = experience.to_numpy()[present]
+        # Float columns keep their dtype so window bounds compare exactly as pandas would
+        if not np.issubdtype(exp.dtype, np.floating):
+            exp = exp.astype(np.float64)
+        sal = salary.to_numpy(dtype=np.float64, na_value=np.nan)[present]
+        
+        # Sort by experience; window bounds are then contiguous row ranges
+        order = np.argsort(exp, kind="stable")
+        self.experience = exp[order]
+        self.salary = sal[order]
+        self.prefix = np.concatenate([[0.0], np.cumsum(self.salary)])
+        
+        # Salary rank of every row, so min, median and max of any window are order statistics over ranks
+        by_salary = np.argsort(self.salary, kind="stable")
+        self.by_rank = self.salary[by_salary]
+        ranks = np.empty(len(self.salary), dtype=np.int64)
+        ranks[by_salary] = np.arange(len(self.salary))
+        self.ranks = WaveletMatrix(ranks)
+    
+    def __len__(self) -> int:
+        return len(self.salary)
+    
+    def _windows(self, experiences: np.ndarray, window: float):
+        """Row ranges covering [experience - window, experience + window]"""
+        lower = (experiences - window).astype(self.experience.dtype)
+        upper = (experiences + window).astype(self.experience.dtype)
+        start = np.searchsorted(self.experience, lower, side="left")
+        stop = np.searchsorted(self.experience, upper, side="right")
+        return start, stop
+    
+    def _order_statistics(self, start: np.ndarray, stop: np.ndarray) -> Dict[str, np.ndarray]:
+        """Min, median and max of each non-empty row window, computed once per distinct window"""
+        windows, inverse = np.unique(np.column_stack([start, stop]), axis=0, return_inverse=True)
+        first, last = windows[:, 0], windows[:, 1]
+        count = last - first
+        # Lowest, both middle (equal for odd counts) and highest elements in one selection
+        positions = [np.zeros_like(count), (count - 1) // 2, count // 2, count - 1]
+        values = self.by_rank[self.ranks.select(
+            np.tile(first, len(positions)), np.tile(last, len(positions)), np.concatenate(positions)
+        )].reshape(len(positions), len(windows))[:, inverse.ravel()]
+        return {
+            "min_salary": values[0],
+            "median_salary": (values[1] + values[2]) / 2,
+            "max_salary": values[3]
+        }
+    
+    def query_batch(self, experiences, window: float = 1.0) -> Dict[str, np.ndarray]:
+        """Benchmark many experience levels at once; empty windows fall back to all rows"""
+        experiences = np.asarray(experiences, dtype=np.float64)
+        start, stop = self._windows(experiences, window)
+        
+        empty = stop <= start
+        start = np.where(empty, 0, start)
+        stop = np.where(empty, len(self.salary), stop)
+        
+        count = stop - start
+        mean = (self.prefix[stop] - self.prefix[start]) / np.maximum(count, 1)
+        statistics = self._order_statistics(start, stop)
+        
+        return {
+            "experience": experiences,
+            "average_salary": mean,
+            "median_salary": statistics["median_salary"],
+            "min_salary": statistics["min_salary"],
+            "max_salary": statistics["max_salary"],
+            "sample_size": count
+        }
+    
+    def query(self, experience: float, window: float = 1.0) -> Dict[str, Any]:
+        """Benchmark a single experience level"""
+        result = self.query_batch([experience], window)
+        return {
+            "experience": experience,
+            "average_salary": float(result["average_salary"][0]),
+            "median_salary": float(result["median_salary"][0]),
+            "min_salary": float(result["min_salary"][0]),
+            "max_salary": float(result["max_salary"][0]),
+            "sample_size": int(result["sample_size"][0])
+        }
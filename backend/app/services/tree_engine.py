@@ -0,0 +1,135 @@
+import json
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+from typing import List, Optional
+
+BLOCK_ROWS = 512  # Rows evaluated per block; keeps the (rows x trees) scratch arrays in cache
+
+class CompiledTrees:
+    """A tree ensemble flattened into contiguous node arrays and evaluated with numpy"""
+    
+    def __init__(self, trees: List[dict], n_features: int, strict: bool, scale: float, base: float):
+        # Nodes of all trees are concatenated; child indices point into the shared arrays
+        offsets = np.cumsum([0] + [len(tree["feature"]) for tree in trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.feature = np.concatenate([tree["feature"] for tree in trees]).astype(np.intp)
+        self.threshold = np.concatenate([tree["threshold"] for tree in trees])
+        # children[2 * node] is the left child and children[2 * node + 1] the right one
+        self.children = np.stack([
+            np.concatenate([tree["left"] + offset for tree, offset in zip(trees, offsets)]),
+            np.concatenate([tree["right"] + offset for tree, offset in zip(trees, offsets)])
+        ], axis=1).astype(np.intp).ravel()
+        self.value = np.concatenate([tree["value"] for tree in trees]).astype(np.float64)
+        # Missing values go right unless a node says otherwise
+        self.default_left = np.concatenate([tree["default_left"] for tree in trees]).astype(bool)
+        self.any_default_left = bool(self.default_left.any())
+        self.depth = max(tree["depth"] for tree in trees)
+        self.n_features = n_features
+        # XGBoost splits on x < t, scikit-learn on x <= t
+        self.strict = strict
+        self.scale = scale
+        self.base = base
+    
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+    
+    def predict(self, X) -> np.ndarray:
+        """Predict a 2-D array of rows in training feature order"""
+        # Both libraries compare float32 features against their thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features per row")
+        
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = self._predict_block(block)
+        return out
+    
+    def _predict_block(self, X: np.ndarray) -> np.ndarray:
+        # One cursor per (row, tree); all trees advance one level per step
+        row_base = (np.arange(len(X), dtype=np.intp) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        flat = X.ravel()
+        for _ in range(self.depth):
+            x = flat[row_base + self.feature[node]]
+            threshold = self.threshold[node]
+            # Negated comparison so NaN goes right
+            go_right = ~(x < threshold) if self.strict else ~(x <= threshold)
+            if self.any_default_left:
+                go_right &= ~(np.isnan(x) & self.default_left[node])
+            # Leaves are their own children, so finished cursors stay put
+            node = self.children[2 * node + go_right]
+        return self.value[node].sum(axis=1) * self.scale + self.base
+
+def _leaf_loops(tree: dict) -> dict:
+    """Point leaves at themselves and give them a harmless split feature"""
+    leaves = tree["left"] < 0
+    index = np.arange(len(leaves))
+    tree["left"] = np.where(leaves, index, tree["left"])
+    tree["right"] = np.where(leaves, index, tree["right"])
+    tree["feature"] = np.where(leaves, 0, tree["feature"])
+    return tree
+
+def compile_random_forest(model: RandomForestRegressor) -> CompiledTrees:
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        trees.append(_leaf_loops({
+            "feature": tree.feature,
+            "threshold": tree.threshold,
+            "left": tree.children_left,
+            "right": tree.children_right,
+            "value": tree.value[:, 0, 0],
+            "default_left": np.zeros(tree.node_count, dtype=bool),
+            "depth": tree.max_depth
+        }))
+    return CompiledTrees(trees, model.n_features_in_, strict=False, scale=1.0 / len(trees), base=0.0)
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    level = [0]
+    while level:
+        level = [child for node in level for child in (left[node], right[node]) if child >= 0]
+        depth += bool(level)
+    return depth
+
+def compile_xgboost(model: XGBRegressor) -> Optional[CompiledTrees]:
+    """Flatten a booster; None when it uses features the evaluator does not support"""
+    learner = json.loads(model.get_booster().save_raw(raw_format="json"))["learner"]
+    booster = learner["gradient_booster"]
+    if learner["objective"]["name"] != "reg:squarederror" or booster["name"] != "gbtree":
+        return None
+    
+    trees = []
+    for tree in booster["model"]["trees"]:
+        if tree["categories_nodes"] or int(tree["tree_param"]["size_leaf_vector"]) > 1:
+            return None
+        left = np.asarray(tree["left_children"], dtype=np.intp)
+        right = np.asarray(tree["right_children"], dtype=np.intp)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        trees.append(_leaf_loops({
+            "feature": np.asarray(tree["split_indices"], dtype=np.intp),
+            "threshold": conditions,
+            "left": left,
+            "right": right,
+            # Leaves store their weight in split_conditions
+            "value": np.where(left < 0, conditions, 0.0),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            "depth": _tree_depth(left, right)
+        }))
+    if not trees:
+        return None
+    
+    base_score = float(learner["learner_model_param"]["base_score"])
+    return CompiledTrees(trees, int(learner["learner_model_param"]["num_feature"]), strict=True, scale=1.0, base=base_score)
+
+def compile_model(model, model_type: str) -> Optional[CompiledTrees]:
+    """Compile a fitted tree ensemble for fast inference, or None to use the model's own predict"""
+    if model_type == "random_forest":
+        return compile_random_forest(model)
+    elif model_type == "xgboost":
+        return compile_xgboost(model)
+    return None
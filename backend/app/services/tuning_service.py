@@ -0,0 +1,151 @@
+import math
+import os
+import time
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import ParameterSampler, train_test_split
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from app.services.model_service import build_model, regression_metrics, feature_importance, MODEL_DEFAULTS, TrainedModel
+
+TUNING_JOBS = int(os.getenv("TUNING_JOBS", "-1"))  # Parallel candidate fits; -1 uses every core
+HALVING_FACTOR = 3  # Keep the best 1/3 of candidates at each rung
+MIN_ESTIMATORS = 10
+MAX_ESTIMATORS = 300
+VALIDATION_FRACTION = 0.2  # Share of the training split used to rank candidates
+
+# Discrete search spaces; the number of trees is the resource successive halving grows
+SEARCH_SPACES = {
+    "random_forest": {
+        "max_depth": [None, 6, 10, 16, 24],
+        "min_samples_leaf": [1, 2, 4, 8, 16],
+        "max_features": [1.0, 0.7, 0.5, "sqrt"]
+    },
+    "xgboost": {
+        "max_depth": [3, 4, 5, 6, 8, 10],
+        "learning_rate": [0.01, 0.03, 0.05, 0.1, 0.2, 0.3],
+        "subsample": [0.6, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "min_child_weight": [1, 3, 5, 10],
+        "reg_lambda": [0.1, 1.0, 10.0]
+    }
+}
+
+def rung_schedule(n_candidates: int, eta: int = HALVING_FACTOR) -> List[Tuple[int, int]]:
+    """(candidates, n_estimators) per rung, with the last rung at the full number of trees"""
+    n_rungs = int(math.floor(math.log(n_candidates, eta) + 1e-9)) + 1
+    schedule = []
+    for rung in range(n_rungs):
+        candidates = max(1, int(math.ceil(n_candidates / eta ** rung)))
+        n_estimators = max(MIN_ESTIMATORS, int(MAX_ESTIMATORS / eta ** (n_rungs - 1 - rung)))
+        schedule.append((candidates, n_estimators))
+    return schedule
+
+def _evaluate(algorithm: str, params: Dict[str, Any], n_estimators: int,
+              X_fit, y_fit, X_val, y_val) -> Tuple[Any, float, float]:
+    """Fit one candidate on one core and score it on the validation split"""
+    model = build_model(algorithm, **params, n_estimators=n_estimators, n_jobs=1)
+    start_time = time.time()
+    model.fit(X_fit, y_fit)
+    fit_time = time.time() - start_time
+    return model, float(regression_metrics(y_val, model.predict(X_val))["r2_score"]), fit_time
+
+def successive_halving(X: pd.DataFrame, y: pd.Series, algorithm: str, budget_seconds: float = 60.0,
+                       n_candidates: int = 27, test_size: float = 0.2,
+                       progress: Optional[Callable[..., None]] = None) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Search an algorithm's space in parallel, dropping weak candidates early, within a time budget"""
+    if algorithm not in SEARCH_SPACES:
+        raise ValueError(f"Algorithm cannot be tuned: {algorithm}")
+    
+    start_time = time.time()
+    deadline = start_time + budget_seconds
+    feature_names = X.columns.tolist()
+    
+    # Candidates are ranked on a validation split; the test split only reports the winner
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_FRACTION, random_state=42)
+    
+    candidates = [
+        {"candidate": i, "params": params}
+        for i, params in enumerate(ParameterSampler(SEARCH_SPACES[algorithm], n_candidates, random_state=42))
+    ]
+    schedule = rung_schedule(len(candidates))
+    batch_size = effective_n_jobs(TUNING_JOBS)
+    
+    leaderboard: Dict[int, Dict[str, Any]] = {}
+    rungs = []
+    winner = None
+    budget_exhausted = False
+    
+    with Parallel(n_jobs=TUNING_JOBS) as parallel:
+        for rung, (keep, n_estimators) in enumerate(schedule):
+            contenders = candidates[:keep]
+            rung_best = None
+            evaluated = 0
+            
+            # Fit in batches of one candidate per core so the budget is checked between batches
+            for offset in range(0, len(contenders), batch_size):
+                batch = contenders[offset:offset + batch_size]
+                results = parallel(
+                    delayed(_evaluate)(algorithm, c["params"], n_estimators, X_fit, y_fit, X_val, y_val)
+                    for c in batch
+                )
+                for candidate, (model, score, fit_time) in zip(batch, results):
+                    candidate["score"] = score
+                    leaderboard[candidate["candidate"]] = {
+                        "candidate": candidate["candidate"],
+                        "params": candidate["params"],
+                        "rung": rung,
+                        "n_estimators": n_estimators,
+                        "validation_r2": score,
+                        "fit_time": fit_time
+                    }
+                    if rung_best is None or score > rung_best[1]:
+                        rung_best = (candidate, score, model)
+                evaluated += len(batch)
+                winner = rung_best
+                
+                if progress is not None:
+                    progress(
+                        "tuning", rung=rung, rungs=len(schedule), n_estimators=n_estimators,
+                        evaluated=evaluated, candidates=len(contenders), best_validation_r2=winner[1],
+                        elapsed=time.time() - start_time
+                    )
+                if time.time() >= deadline:
+                    budget_exhausted = offset + batch_size < len(contenders) or rung < len(schedule) - 1
+                    break
+            
+            rungs.append({"rung": rung, "n_estimators": n_estimators, "candidates": len(contenders), "evaluated": evaluated})
+            if budget_exhausted:
+                break
+            
+            # Promote the best fraction of this rung
+            candidates = sorted(contenders, key=lambda c: c["score"], reverse=True)
+    
+    if progress is not None:
+        progress("evaluating")
+    best, _, model = winner
+    # Candidates were fitted single-threaded; serve the winner with the usual threading
+    model.set_params(n_jobs=MODEL_DEFAULTS[algorithm]["n_jobs"])
+    metrics = regression_metrics(y_test, model.predict(X_test))
+    ranked = sorted(leaderboard.values(), key=lambda e: (e["rung"], e["validation_r2"]), reverse=True)
+    for rank, entry in enumerate(ranked, start=1):
+        entry["rank"] = rank
+    
+    return TrainedModel(model, algorithm, feature_names, metrics), {
+        "message": "Model tuned successfully",
+        "algorithm": algorithm,
+        "metrics": metrics,
+        "training_time": time.time() - start_time,
+        "feature_importance": feature_importance(model, feature_names),
+        "best_params": {**best["params"], "n_estimators": leaderboard[best["candidate"]]["n_estimators"]},
+        "leaderboard": ranked,
+        "rungs": rungs,
+        "budget_seconds": budget_seconds,
+        "budget_exhausted": budget_exhausted
+    }
+
+def tune_worker(progress: Callable[..., None], X: pd.DataFrame, y: pd.Series, algorithm: str,
+                budget_seconds: float = 60.0, n_candidates: int = 27,
+                test_size: float = 0.2) -> Tuple[TrainedModel, Dict[str, Any]]:
+    """Entry point for tuning in a worker process"""
+    return successive_halving(X, y, algorithm, budget_seconds, n_candidates, test_size, progress=progress)
@@ -0,0 +1,92 @@
+from fastapi import HTTPException
+from fastapi.responses import Response
+from typing import Dict, Any, Optional
+import io
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Accept media types mapped to response formats
+FORMATS = {
+    "application/json": "json",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/x-npy": "npy",
+    "*/*": "json"
+}
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack",
+    "npy": "application/x-npy"
+}
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the response format for an Accept header; JSON unless a supported binary type is preferred"""
+    if not accept:
+        return "json"
+    
+    best, best_q, recognised = "json", -1.0, False
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        fmt = FORMATS.get(media_type.lower())
+        if fmt is None:
+            continue
+        recognised = True
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        # Earlier entries win ties
+        if q > best_q and q > 0:
+            best, best_q = fmt, q
+    
+    if recognised and best_q < 0:
+        raise HTTPException(status_code=406, detail="No acceptable response format")
+    return best
+
+def _numpy_column(values) -> np.ndarray:
+    """A column as a plain numpy array: numbers stay numeric (NA as NaN), everything else becomes text"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    dtype = series.dtype
+    if pd.api.types.is_numeric_dtype(dtype):
+        if hasattr(dtype, "numpy_dtype"):
+            # Nullable extension dtypes; NA has no integer representation
+            return series.to_numpy(dtype=np.float64 if series.hasnans else dtype.numpy_dtype, na_value=np.nan)
+        return series.to_numpy()
+    return series.astype(str).to_numpy(dtype=str)
+
+def _msgpack_column(values) -> Any:
+    """A column for MessagePack: numbers as their raw little-endian buffer, text as a list of strings"""
+    array = _numpy_column(values)
+    if array.dtype.kind not in "biuf":
+        return array.tolist()
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    # Decodes with np.frombuffer(data, dtype)
+    return {"dtype": array.dtype.str, "length": len(array), "data": array.tobytes()}
+
+def table_response(fmt: str, columns: Dict[str, Any]) -> Response:
+    """Serialise named columns (numpy arrays or Series) as Arrow IPC, MessagePack or NPY"""
+    if fmt == "arrow":
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        content = sink.getvalue().to_pybytes()
+    elif fmt == "msgpack":
+        # Column-oriented map, so no per-row objects are built
+        content = msgpack.packb({name: _msgpack_column(values) for name, values in columns.items()})
+    elif fmt == "npy":
+        arrays = [_numpy_column(values) for values in columns.values()]
+        # One column is sent as a plain array, several as a structured array
+        array = arrays[0] if len(arrays) == 1 else np.rec.fromarrays(arrays, names=list(columns))
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        content = buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown response format: {fmt}")
+    return Response(content=content, media_type=MEDIA_TYPES[fmt])
@@ -1,17 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 from dotenv import load_dotenv
 
-from app.routes import upload, visualization, model, prediction, insights
-
+# Load environment before the routers read their settings
 load_dotenv()
 
+from app.routes import upload, visualization, model, prediction, insights, jobs
+from app.services.job_service import JobService
+from app.services.model_service import ModelService
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the active model off the event loop; /ready reports when it is done
+    JobService().submit("preload", lambda job: ModelService().preload(job.update))
+    yield
+    # Worker processes are not daemonic, so stop them before the server exits
+    JobService().shutdown()
+
 app = FastAPI(
     title="Employee Salary Prediction API",
     description="API for predicting employee salaries using machine learning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -36,6 +50,7 @@ app.include_router(visualization.router, prefix="/api/visualization", tags=["Vis
 app.include_router(model.router, prefix="/api/model", tags=["Model"])
 app.include_router(prediction.router, prefix="/api/prediction", tags=["Prediction"])
 app.include_router(insights.router, prefix="/api/insights", tags=["Insights"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
 
 @app.get("/")
 async def root():
@@ -48,3 +63,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    readiness = ModelService().get_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
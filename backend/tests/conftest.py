@@ -0,0 +1,15 @@
+import pytest
+
+from app.services.data_service import DataService, DATASET_MEMORY_BUDGET
+from app.services.dataset_cache import DatasetCache
+
+@pytest.fixture
+def data_service(tmp_path, monkeypatch):
+    """The DataService singleton with an empty registry and caches of its own"""
+    service = DataService()
+    monkeypatch.setattr(service, "_cache", DatasetCache(str(tmp_path / "uploads")))
+    monkeypatch.setattr(service, "_working", DatasetCache(str(tmp_path / "uploads" / "working")))
+    monkeypatch.setattr(service, "_datasets", type(service._datasets)())
+    monkeypatch.setattr(service, "_active_id", None)
+    monkeypatch.setattr(service, "memory_budget", DATASET_MEMORY_BUDGET)
+    return service
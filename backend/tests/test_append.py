@@ -0,0 +1,66 @@
+"""
+Appending rows: validation, cleaning with the fitted rules and stable column dtypes
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+DIGEST = "a" * 64
+
+@pytest.fixture
+def dataset(data_service, tmp_path):
+    """A cleaned dataset with an int32 Experience and a float32 Salary column"""
+    rows = 200
+    pd.DataFrame({
+        "Experience": np.arange(rows) % 20,
+        "Salary": 40000.5 + 1000 * (np.arange(rows) % 20),
+        "Dept": np.where(np.arange(rows) % 2, "Eng", "HR")
+    }).to_csv(tmp_path / "data.csv", index=False)
+    data_service.load_upload(str(tmp_path / "data.csv"), DIGEST)
+    return data_service
+
+def test_dtypes_survive_appends(dataset):
+    before = dataset.get_data(DIGEST).dtypes
+    assert str(before["Experience"]) == "int32" and str(before["Salary"]) == "float32"
+    
+    # Whole-number salaries on their own would be stored as int32
+    dataset.append_data(pd.DataFrame({"Experience": [3, 4], "Salary": [45000, 46000], "Dept": ["Ops", "HR"]}), DIGEST)
+    
+    for frame in (dataset.get_data(DIGEST), dataset.get_original_data(DIGEST)):
+        assert frame["Experience"].dtype == before["Experience"]
+        assert frame["Salary"].dtype == before["Salary"]
+        assert isinstance(frame["Dept"].dtype, pd.CategoricalDtype)
+    data = dataset.get_data(DIGEST)
+    assert data["Salary"].iloc[-2:].tolist() == [45000.0, 46000.0]
+    assert data["Dept"].iloc[-2:].tolist() == ["Ops", "HR"]
+
+def test_values_that_do_not_fit_widen_the_column(dataset):
+    dataset.append_data(pd.DataFrame({"Experience": [2.5], "Salary": [45000.25], "Dept": ["HR"]}), DIGEST)
+    
+    data = dataset.get_data(DIGEST)
+    assert data["Experience"].iloc[-1] == 2.5
+    assert data["Salary"].iloc[-1] == 45000.25
+
+def test_appended_rows_are_cleaned_with_the_fitted_rules(dataset):
+    result = dataset.append_data(pd.DataFrame({
+        "Experience": [5, None, 6],
+        "Salary": [47000.5, 48000.5, 10 ** 7],
+        "Dept": ["HR", "Eng", "Eng"]
+    }), DIGEST)
+    
+    assert result["rows_received"] == 3
+    # The missing experience is filled with the fitted median; the huge salary is past the fitted bounds
+    assert result["rows_appended"] == 2
+    assert result["rows_dropped_outliers"] == 1
+    fill = dataset._resolve(DIGEST).cleaning_rules["fill_values"]["Experience"]
+    assert dataset.get_data(DIGEST)["Experience"].iloc[-2:].tolist() == [5, fill]
+
+def test_non_numeric_values_are_rejected(dataset):
+    with pytest.raises(ValueError, match="non-numeric"):
+        dataset.append_data(pd.DataFrame({"Experience": [1], "Salary": ["lots"], "Dept": ["HR"]}), DIGEST)
+    assert len(dataset.get_data(DIGEST)) == 200
+
+def test_missing_columns_are_rejected(dataset):
+    with pytest.raises(ValueError, match="missing columns"):
+        dataset.append_data(pd.DataFrame({"Experience": [1]}), DIGEST)
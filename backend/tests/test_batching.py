@@ -0,0 +1,84 @@
+"""
+Concurrent single predictions share one model call, made off the event loop
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services import batching_service
+from app.services.batching_service import PredictionBatcher
+
+class FakeModelService:
+    """Doubles x, rejecting negative rows"""
+    
+    def __init__(self, on_batch=None):
+        self.batches = []
+        self.on_batch = on_batch
+    
+    def predict(self, features, version=None):
+        if features["x"] < 0:
+            raise ValueError(f"bad row: {features['x']}")
+        return 2 * features["x"]
+    
+    def predict_batch(self, features_list, version=None):
+        self.batches.append((len(features_list), version))
+        if self.on_batch is not None:
+            self.on_batch()
+        return [self.predict(features, version) for features in features_list]
+
+@pytest.fixture
+def batcher(monkeypatch):
+    batcher = PredictionBatcher()
+    monkeypatch.setattr(batcher, "_model_service", FakeModelService())
+    monkeypatch.setattr(batcher, "_pending", {})
+    monkeypatch.setattr(batcher, "_timers", {})
+    monkeypatch.setattr(batcher, "_last_arrival", None)
+    monkeypatch.setattr(batcher, "_gap", None)
+    return batcher
+
+async def predict_all(batcher, xs, version=None):
+    return await asyncio.gather(*[batcher.predict({"x": x}, version) for x in xs], return_exceptions=True)
+
+def test_concurrent_requests_share_one_call(batcher):
+    results = asyncio.run(predict_all(batcher, range(10)))
+    
+    assert results == [2 * x for x in range(10)]
+    assert batcher._model_service.batches == [(10, None)]
+
+def test_batches_split_by_size_and_version(batcher, monkeypatch):
+    monkeypatch.setattr(batching_service, "BATCH_MAX_SIZE", 4)
+    
+    async def run():
+        return await asyncio.gather(predict_all(batcher, range(6), version=1), predict_all(batcher, range(3), version=2))
+    
+    first, second = asyncio.run(run())
+    assert first == [2 * x for x in range(6)] and second == [0, 2, 4]
+    assert sorted(batcher._model_service.batches) == [(2, 1), (3, 2), (4, 1)]
+
+def test_bad_row_fails_only_its_own_request(batcher):
+    results = asyncio.run(predict_all(batcher, [1, -1, 3]))
+    
+    assert results[0] == 2 and results[2] == 6
+    assert isinstance(results[1], ValueError)
+
+def test_prediction_runs_off_the_event_loop(batcher):
+    started, loop_ran, seen = threading.Event(), threading.Event(), []
+    
+    def on_batch():
+        # Wait for a coroutine to run, which it never could if the call blocked the loop
+        started.set()
+        seen.append(loop_ran.wait(1.0))
+    
+    batcher._model_service.on_batch = on_batch
+    
+    async def run():
+        request = asyncio.ensure_future(batcher.predict({"x": 5}))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        loop_ran.set()
+        return await request
+    
+    assert asyncio.run(run()) == 10
+    assert seen == [True]
@@ -0,0 +1,37 @@
+"""
+Once the registry is over its memory budget, only the dataset in use stays in memory
+"""
+
+import hashlib
+
+from tests.test_ingest import write_csv
+
+def upload(data_service, path):
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    data_service.load_upload(str(path), digest)
+    return digest
+
+def test_upload_kept_on_disk_evicts_resident_datasets(data_service, tmp_path):
+    first = upload(data_service, write_csv(tmp_path / "first.csv", seed=1))
+    assert data_service._datasets[first].is_loaded
+    
+    data_service.memory_budget = 1
+    second = upload(data_service, write_csv(tmp_path / "second.csv", seed=2))
+    
+    assert data_service.get_dataset_id() == second
+    assert not data_service._datasets[first].is_loaded
+    assert data_service.get_memory_usage()["used"] == 0
+
+def test_reload_evicts_other_datasets(data_service, tmp_path):
+    first = upload(data_service, write_csv(tmp_path / "first.csv", seed=1))
+    data_service.memory_budget = 1
+    second = upload(data_service, write_csv(tmp_path / "second.csv", seed=2))
+    
+    data_service.load_cached(first)
+    rows = data_service.get_summary()["rows"]
+    assert len(data_service.get_data()) == rows
+    assert data_service._datasets[first].is_loaded
+    
+    data_service.get_data(second)
+    assert data_service._datasets[second].is_loaded
+    assert not data_service._datasets[first].is_loaded
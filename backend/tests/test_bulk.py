@@ -0,0 +1,47 @@
+"""
+Bulk prediction streams end with an error record when scoring fails part way
+"""
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes.prediction import _format_chunks, BULK_ERROR_MARKER
+
+def scored_chunks(fail_after):
+    """Two scored chunks, failing before the second one when asked to"""
+    yield pd.DataFrame({"Experience": [1.0, 2.0]}), np.array([10.0, 20.0])
+    if fail_after:
+        raise ValueError("Missing feature columns: Experience")
+    yield pd.DataFrame({"Experience": [3.0]}), np.array([30.0])
+
+def stream(tmp_path, extension, fail_after):
+    file_path = tmp_path / f"bulk{extension}"
+    file_path.write_text("")
+    scored = scored_chunks(fail_after)
+    body = "".join(_format_chunks(next(scored), scored, io.StringIO(), extension, str(file_path)))
+    assert not file_path.exists()
+    return body
+
+@pytest.mark.parametrize("fail_after", [False, True])
+def test_csv_stream(tmp_path, fail_after):
+    lines = stream(tmp_path, ".csv", fail_after).splitlines()
+    
+    assert lines[:3] == ["Experience,predicted_salary", "1.0,10.0", "2.0,20.0"]
+    if fail_after:
+        assert lines[3:] == [f"{BULK_ERROR_MARKER}Error making bulk predictions: Missing feature columns: Experience"]
+    else:
+        assert lines[3:] == ["3.0,30.0"]
+
+@pytest.mark.parametrize("fail_after", [False, True])
+def test_ndjson_stream(tmp_path, fail_after):
+    records = [json.loads(line) for line in stream(tmp_path, ".ndjson", fail_after).splitlines()]
+    
+    assert records[:2] == [{"Experience": 1.0, "predicted_salary": 10.0}, {"Experience": 2.0, "predicted_salary": 20.0}]
+    if fail_after:
+        assert records[2:] == [{"error": "Error making bulk predictions: Missing feature columns: Experience"}]
+    else:
+        assert records[2:] == [{"Experience": 3.0, "predicted_salary": 30.0}]
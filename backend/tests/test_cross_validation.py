@@ -0,0 +1,52 @@
+"""
+Cross-validation folds: a proper partition, computed once per dataset version
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import model as model_routes
+from app.services import model_service
+from app.services.model_service import fold_assignments
+
+@pytest.mark.parametrize("n_rows, n_splits, n_repeats", [(10, 5, 1), (103, 5, 3), (1000, 10, 2)])
+def test_fold_assignments_partition_rows(n_rows, n_splits, n_repeats):
+    folds = fold_assignments(n_rows, n_splits, n_repeats)
+    
+    assert folds.shape == (n_repeats, n_rows)
+    for repeat in folds:
+        sizes = np.bincount(repeat, minlength=n_splits)
+        assert len(sizes) == n_splits and sizes.max() - sizes.min() <= 1
+    np.testing.assert_array_equal(folds, fold_assignments(n_rows, n_splits, n_repeats))
+
+@pytest.fixture
+def dataset(data_service, tmp_path, monkeypatch):
+    # One fold at a time, so the test does not spawn worker processes
+    monkeypatch.setattr(model_service, "CV_JOBS", 1)
+    rng = np.random.default_rng(0)
+    experience = rng.uniform(0, 20, 200).round(1)
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"Experience": experience, "Salary": 30000 + 1000 * experience}).to_csv(path, index=False)
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    data_service.load_upload(str(path), digest)
+    return digest
+
+def test_folds_shared_until_the_data_changes(data_service, dataset, monkeypatch):
+    calls = []
+    
+    def counting(n_rows, n_splits, n_repeats):
+        calls.append(n_rows)
+        return fold_assignments(n_rows, n_splits, n_repeats)
+    
+    monkeypatch.setattr(model_routes, "fold_assignments", counting)
+    for algorithm in ("linear", "random_forest"):
+        result = model_routes._cross_validate(algorithm, 5, 1, dataset)
+        assert result["n_splits"] == 5
+    assert calls == [200]
+    
+    data_service.append_data(pd.DataFrame({"Experience": [5.0, 6.0], "Salary": [35000.0, 36000.0]}), dataset)
+    model_routes._cross_validate("linear", 5, 1, dataset)
+    assert calls == [200, 202]
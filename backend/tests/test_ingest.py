@@ -0,0 +1,79 @@
+"""
+Chunked ingestion and on-disk cleaning must give what reading the whole CSV,
+optimize_dtypes and clean_frame give
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.data_service import optimize_dtypes, clean_frame, memory_report
+from app.services.job_service import JobCancelled
+
+DIGEST = "0" * 64
+
+def write_csv(path, rows=1000, seed=0):
+    """Columns covering every dtype rule: ints, integral floats with gaps, floats, categories, free text, booleans"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Experience": np.round(rng.uniform(0, 30, rows), 1),
+        "Salary": rng.normal(100000, 20000, rows).round(0),
+        "Age": rng.integers(20, 60, rows).astype(float),
+        "Dept": rng.choice(["HR", "Eng", "Ops"], rows),
+        "Name": [f"employee-{i}" for i in range(rows)],
+        "Big": rng.integers(0, 2 ** 40, rows),
+        "Flag": rng.choice([True, False], rows),
+        "Score": rng.normal(size=rows)
+    })
+    df.loc[rng.choice(rows, 30), "Age"] = np.nan
+    df.loc[rng.choice(rows, 5), "Dept"] = np.nan
+    df.loc[rng.choice(rows, 20), "Salary"] = np.nan
+    df.loc[rng.choice(rows, 40), "Salary"] *= 5
+    # Gaps that only show up in the last chunk
+    df.loc[rows - 5:, "Age"] = np.nan
+    df.to_csv(path, index=False)
+    return path
+
+@pytest.mark.parametrize("chunksize", [7, 333, 100_000])
+def test_chunked_ingest_matches_whole_file(data_service, tmp_path, chunksize):
+    path = write_csv(tmp_path / "data.csv")
+    parsed = pd.read_csv(path)
+    expected = optimize_dtypes(parsed)
+    expected_clean, expected_rules, expected_report = clean_frame(expected)
+    
+    nbytes, report = data_service._ingest(str(path), DIGEST, chunksize=chunksize)
+    raw = data_service._cache.read_frame(DIGEST, "raw")
+    pd.testing.assert_frame_equal(raw, expected)
+    assert report == memory_report(parsed, expected)
+    assert nbytes == sum(column["after"] for column in report.values())
+    
+    rules, cleaning_report = data_service._clean_stored(DIGEST)
+    cleaned = data_service._cache.read_frame(DIGEST, "clean")
+    pd.testing.assert_frame_equal(cleaned, expected_clean.reset_index(drop=True))
+    assert rules == expected_rules
+    assert cleaning_report == expected_report
+
+def test_upload_over_budget_is_cleaned_on_disk(data_service, tmp_path):
+    path = write_csv(tmp_path / "data.csv")
+    expected_clean, _, expected_report = clean_frame(optimize_dtypes(pd.read_csv(path)))
+    data_service.memory_budget = 1
+    
+    data_service.load_upload(str(path), DIGEST)
+    
+    assert not data_service._datasets[DIGEST].is_loaded
+    assert data_service.get_summary(DIGEST)["rows"] == len(expected_clean)
+    assert data_service.get_cleaning_report(DIGEST) == expected_report
+    pd.testing.assert_frame_equal(data_service.get_preview_frame(3, DIGEST), expected_clean.head(3).reset_index(drop=True))
+
+def test_cancelled_upload_leaves_no_cache_entry(data_service, tmp_path):
+    path = write_csv(tmp_path / "data.csv")
+    
+    def cancel(phase=None, **counters):
+        if phase == "cleaning":
+            raise JobCancelled()
+    
+    with pytest.raises(JobCancelled):
+        data_service.load_upload(str(path), DIGEST, progress=cancel)
+    assert not data_service._cache.has(DIGEST)
+    assert list((tmp_path / "uploads").glob(f"{DIGEST}*")) == []
+    assert DIGEST not in data_service._datasets
@@ -0,0 +1,68 @@
+"""
+Job checkpoints, commit points and cancellation
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.services.job_service import JobService, JobNotCancellable
+
+TIMEOUT = 10.0
+
+def wait_finished(job):
+    deadline = time.monotonic() + TIMEOUT
+    while not job.finished:
+        assert time.monotonic() < deadline, f"job still {job.status} in phase '{job.phase}'"
+        time.sleep(0.01)
+    return job
+
+def test_cancel_stops_job_at_next_checkpoint():
+    started, cancelled, reached = threading.Event(), threading.Event(), []
+    
+    def work(job):
+        job.checkpoint("loading", rows=10)
+        started.set()
+        cancelled.wait(TIMEOUT)
+        job.checkpoint("training")
+        reached.append("training")
+    
+    service = JobService()
+    job = service.submit("test", work)
+    assert started.wait(TIMEOUT)
+    assert job.progress == {"rows": 10}
+    service.cancel(job.job_id)
+    cancelled.set()
+    
+    assert wait_finished(job).status == "cancelled"
+    assert reached == []
+
+def test_cancel_refused_after_commit():
+    committed, release = threading.Event(), threading.Event()
+    
+    def work(job):
+        job.checkpoint("saving")
+        job.commit()
+        committed.set()
+        release.wait(TIMEOUT)
+        return "published"
+    
+    service = JobService()
+    job = service.submit("test", work)
+    assert committed.wait(TIMEOUT)
+    with pytest.raises(JobNotCancellable):
+        service.cancel(job.job_id)
+    release.set()
+    
+    assert wait_finished(job).status == "completed"
+    assert job.result == "published"
+
+def test_job_failure_is_reported():
+    def work(job):
+        job.checkpoint("loading")
+        raise ValueError("bad input")
+    
+    job = wait_finished(JobService().submit("test", work))
+    assert job.status == "failed"
+    assert job.error == "bad input"
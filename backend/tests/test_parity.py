@@ -0,0 +1,48 @@
+"""
+Parity checks for the compiled tree evaluator against each library's own predict
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+
+from app.services.tree_engine import compile_random_forest, compile_xgboost
+
+def make_regression(rows=2000, features=4, seed=0):
+    """Salary-like target over a few features, some with missing values"""
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 30, size=(rows, features))
+    y = 30000 + 4000 * X[:, 0] + 500 * X[:, 1] ** 1.5 + rng.normal(0, 5000, rows)
+    return X, y
+
+def scoring_rows(X, seed=1):
+    """Training rows, unseen rows, rows sitting exactly on split thresholds and rows with NaN"""
+    rng = np.random.default_rng(seed)
+    unseen = rng.uniform(-5, 35, size=(500, X.shape[1]))
+    on_threshold = np.round(X[:200], 1)
+    missing = unseen[:100].copy()
+    missing[rng.random(missing.shape) < 0.3] = np.nan
+    return np.vstack([X, unseen, on_threshold, missing])
+
+def test_random_forest_matches_sklearn():
+    X, y = make_regression()
+    model = RandomForestRegressor(n_estimators=30, max_depth=12, random_state=0).fit(X, y)
+    rows = scoring_rows(X)[:-100]  # scikit-learn 1.3 trees reject NaN
+    
+    compiled = compile_random_forest(model)
+    np.testing.assert_allclose(compiled.predict(rows), model.predict(rows), rtol=1e-12, atol=1e-9)
+
+def test_xgboost_matches_booster():
+    X, y = make_regression()
+    model = XGBRegressor(n_estimators=60, max_depth=6, learning_rate=0.1, random_state=0).fit(X, y)
+    rows = scoring_rows(X)
+    
+    compiled = compile_xgboost(model)
+    assert compiled is not None
+    # XGBoost sums leaf weights in float32
+    np.testing.assert_allclose(compiled.predict(rows), model.predict(rows), rtol=1e-6, atol=1e-3)
+
+def test_xgboost_unsupported_objective_falls_back():
+    X, y = make_regression(rows=200)
+    model = XGBRegressor(n_estimators=5, objective="reg:absoluteerror").fit(X, y)
+    assert compile_xgboost(model) is None
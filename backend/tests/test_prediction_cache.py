@@ -0,0 +1,63 @@
+"""
+Cached predictions are keyed by model version and never outlive a model swap
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.model_registry import ModelRegistry
+from app.services.model_service import ModelService
+from app.services.prediction_cache import PredictionCache
+
+ROWS = np.array([[1.0, 30.0], [2.0, 31.0]])
+
+def test_lookup_is_per_version():
+    cache = PredictionCache(max_entries=10, ttl=60)
+    cache.store(1, ROWS, [100.0, 200.0])
+    
+    assert cache.lookup(1, ROWS) == [100.0, 200.0]
+    assert cache.lookup(2, ROWS) == [None, None]
+    assert cache.lookup(1, ROWS + 0.5) == [None, None]
+
+def test_bounded_and_expiring():
+    cache = PredictionCache(max_entries=1, ttl=60)
+    cache.store(1, ROWS, [100.0, 200.0])
+    assert cache.lookup(1, ROWS) == [None, 200.0]
+    assert cache.get_stats()["evictions"] == 1
+    
+    expired = PredictionCache(max_entries=10, ttl=0)
+    expired.store(1, ROWS, [100.0, 200.0])
+    assert expired.lookup(1, ROWS) == [None, None]
+    assert expired.get_stats()["expirations"] == 2
+
+@pytest.fixture
+def model_service(tmp_path, monkeypatch):
+    """The ModelService singleton with no live model and a registry of its own"""
+    service = ModelService()
+    monkeypatch.setattr(service, "_registry", ModelRegistry(str(tmp_path / "registry")))
+    monkeypatch.setattr(service, "_current", None)
+    monkeypatch.setattr(service, "_cache", PredictionCache(max_entries=100, ttl=60))
+    return service
+
+def train(model_service, slope):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"Experience": rng.uniform(0, 20, 200), "Age": rng.uniform(20, 60, 200)})
+    y = pd.Series(30000 + slope * X["Experience"], name="Salary")
+    return model_service.train_model(X, y, algorithm="linear")["version"]
+
+def test_model_swaps_invalidate_cached_predictions(model_service, tmp_path):
+    features = {"Experience": 10.0, "Age": 40.0}
+    first = train(model_service, slope=1000)
+    assert model_service.predict(features) == pytest.approx(40000)
+    assert model_service.predict(features) == pytest.approx(40000)
+    assert model_service.get_cache_stats()["hits"] == 1
+    
+    # Publishing a new version
+    train(model_service, slope=2000)
+    assert model_service.predict(features) == pytest.approx(50000)
+    
+    # Another worker process moving the active pointer back
+    ModelRegistry(str(tmp_path / "registry")).set_active(first)
+    assert model_service.predict(features) == pytest.approx(40000)
+    assert model_service.get_cache_stats()["hits"] == 0
@@ -0,0 +1,38 @@
+"""
+Model registry: version numbers claimed across processes and the shared active pointer
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.services.model_registry import ModelRegistry
+
+def register(registry_dir, tag):
+    """Register one model in a fresh registry instance, as another worker process would"""
+    return ModelRegistry(registry_dir).register({"tag": tag}, {"tag": tag})
+
+def test_concurrent_registrations_claim_distinct_versions(tmp_path):
+    registry_dir = str(tmp_path / "registry")
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as processes, \
+            ThreadPoolExecutor(max_workers=4) as threads:
+        futures = [processes.submit(register, registry_dir, f"process-{i}") for i in range(4)]
+        futures += [threads.submit(register, registry_dir, f"thread-{i}") for i in range(8)]
+        versions = [future.result() for future in futures]
+    
+    registry = ModelRegistry(registry_dir)
+    assert sorted(versions) == list(range(1, 13))
+    assert registry.versions() == sorted(versions)
+    for version in versions:
+        assert registry.load(version) == {"tag": registry.get_meta(version)["tag"]}
+    assert [name for name in os.listdir(registry_dir) if name.startswith(".tmp-")] == []
+
+def test_active_pointer_is_shared_between_instances(tmp_path):
+    writer, reader = ModelRegistry(str(tmp_path)), ModelRegistry(str(tmp_path))
+    assert reader.get_active() is None
+    
+    writer.set_active(2)
+    assert reader.get_active() == 2
+    writer.set_active(1)
+    assert reader.get_active() == 1
+    assert sorted(os.listdir(tmp_path)) == ["active.json"]
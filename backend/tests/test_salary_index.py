@@ -0,0 +1,63 @@
+"""
+Parity checks for the salary index against the boolean-mask scan the benchmark endpoint used to run
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.salary_index import SalaryIndex
+
+def scan_benchmark(data, experience, window=1.0):
+    """The boolean-mask benchmark the index replaced"""
+    similar = data[(data["Experience"] >= experience - window) & (data["Experience"] <= experience + window)]
+    if len(similar) == 0:
+        similar = data
+    return {
+        "average_salary": float(similar["Salary"].mean()),
+        "median_salary": float(similar["Salary"].median()),
+        "min_salary": float(similar["Salary"].min()),
+        "max_salary": float(similar["Salary"].max()),
+        "sample_size": len(similar)
+    }
+
+@pytest.mark.parametrize("experience", [
+    pd.Series(np.random.default_rng(2).integers(0, 25, 3000)),
+    pd.Series(np.round(np.random.default_rng(3).uniform(0, 25, 3000), 1)),
+    pd.Series(np.random.default_rng(4).uniform(0, 25, 3000).astype(np.float32)),
+    pd.Series(np.random.default_rng(5).uniform(0, 25, 3000))
+], ids=["integer", "one_decimal", "float32", "continuous"])
+@pytest.mark.parametrize("window", [0.5, 1.0, 3.0])
+def test_salary_index_matches_scan(experience, window):
+    rng = np.random.default_rng(6)
+    data = pd.DataFrame({
+        "Experience": experience,
+        # Rounded salaries repeat, so ties in the rank index are exercised
+        "Salary": np.round(rng.normal(90000, 25000, len(experience)), -3)
+    })
+    index = SalaryIndex(data["Experience"], data["Salary"])
+    # Window edges, gaps between levels and experiences outside the data
+    queries = np.concatenate([np.arange(-3, 29, 0.25), data["Experience"].to_numpy()[:200], [100.0]])
+    
+    batch = index.query_batch(queries, window)
+    for i, experience_level in enumerate(queries):
+        expected = scan_benchmark(data, experience_level, window)
+        assert batch["sample_size"][i] == expected["sample_size"]
+        for key in ("median_salary", "min_salary", "max_salary"):
+            assert batch[key][i] == expected[key]
+        assert batch["average_salary"][i] == pytest.approx(expected["average_salary"], rel=1e-12)
+
+def test_salary_index_single_query():
+    data = pd.DataFrame({"Experience": [1.0, 2.0, 2.0, 3.5, 10.0], "Salary": [40000, 52000, 50000, 61000, 120000]})
+    index = SalaryIndex(data["Experience"], data["Salary"])
+    
+    assert index.query(2.0) == {
+        "experience": 2.0,
+        "average_salary": pytest.approx(142000.0 / 3),
+        "median_salary": 50000.0,
+        "min_salary": 40000.0,
+        "max_salary": 52000.0,
+        "sample_size": 3
+    }
+    # No rows within the window: every row is used
+    assert index.query(6.0)["sample_size"] == 5
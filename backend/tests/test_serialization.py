@@ -0,0 +1,67 @@
+"""
+Accept negotiation and the binary table formats
+"""
+
+import io
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException
+
+from app.utils.serialization import negotiate, table_response
+
+@pytest.mark.parametrize("accept, fmt", [
+    (None, "json"),
+    ("", "json"),
+    ("*/*", "json"),
+    ("text/html", "json"),
+    ("application/vnd.apache.arrow.stream", "arrow"),
+    ("application/x-msgpack", "msgpack"),
+    ("application/json;q=0.5, application/msgpack", "msgpack"),
+    ("application/x-npy;q=0.9, application/json", "json"),
+    ("application/msgpack, application/x-npy", "msgpack"),
+    ("application/msgpack;q=0, application/x-npy;q=0.1", "npy"),
+    ("text/html, application/vnd.apache.arrow.stream;q=0.2", "arrow")
+])
+def test_negotiate(accept, fmt):
+    assert negotiate(accept) == fmt
+
+def test_negotiate_refuses_only_excluded_formats():
+    with pytest.raises(HTTPException) as error:
+        negotiate("application/json;q=0, application/msgpack;q=0")
+    assert error.value.status_code == 406
+
+@pytest.fixture
+def columns():
+    return {
+        "experience": np.array([1.5, 3.0, 7.25]),
+        "count": pd.Series([1, 2, None], dtype="Int64"),
+        "rank": np.array([3, 1, 2], dtype=np.int32),
+        "dept": pd.Series(["HR", "Eng", "Ops"], dtype="category")
+    }
+
+def test_msgpack_sends_numeric_columns_as_raw_buffers(columns):
+    response = table_response("msgpack", columns)
+    assert response.media_type == "application/msgpack"
+    decoded = msgpack.unpackb(response.body)
+    
+    experience = decoded["experience"]
+    assert experience["dtype"] == "<f8" and experience["length"] == 3
+    np.testing.assert_array_equal(np.frombuffer(experience["data"], experience["dtype"]), columns["experience"])
+    np.testing.assert_array_equal(np.frombuffer(decoded["count"]["data"], decoded["count"]["dtype"]), [1.0, 2.0, np.nan])
+    assert decoded["rank"]["dtype"] == "<i4"
+    np.testing.assert_array_equal(np.frombuffer(decoded["rank"]["data"], decoded["rank"]["dtype"]), [3, 1, 2])
+    assert decoded["dept"] == ["HR", "Eng", "Ops"]
+
+def test_arrow_and_npy_round_trip(columns):
+    table = pa.ipc.open_stream(table_response("arrow", columns).body).read_all()
+    assert table.column("experience").to_pylist() == [1.5, 3.0, 7.25]
+    assert table.column("count").to_pylist() == [1, 2, None]
+    
+    array = np.load(io.BytesIO(table_response("npy", columns).body), allow_pickle=False)
+    assert array.dtype.names == tuple(columns)
+    np.testing.assert_array_equal(array["rank"], [3, 1, 2])
+    assert array["dept"].tolist() == ["HR", "Eng", "Ops"]